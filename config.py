@@ -9,14 +9,33 @@ DEFAULTS = {
     "wake_word": "hey assistant",
     "ollama_url": "http://localhost:11434",
     "ollama_model": "mistral",
+    "ollama_stream": True,
+    "ollama_keep_alive": 600,
+    "ollama_rewarm_margin": 60,
+    "ollama_active_window": 1800,
+    "ollama_load_timeout": 120,
+    "ollama_stable_prefix": True,
+    "ollama_health_interval": 10,
+    "http_max_hosts": 4,
+    "http_max_per_host": 4,
+    "http_connect_timeout": 3.05,
+    "http_read_timeout": 30,
     "vosk_model_path": str(CONFIG_DIR / "vosk-model"),
     "voice_rate": 175,
     "voice_volume": 1.0,
     "tts_model": "tts_models/en/ljspeech/tacotron2-DDC",
+    "asr_two_pass": True,
+    "asr_context_grammars": True,
+    "asr_confirm_timeout": 10,
     "whisper_model_size": "base",
     "whisper_compute_type": "int8",
+    "vad_enabled": True,
+    "vad_frame_ms": 30,
     "vad_aggressiveness": 2,
     "vad_silence_frames": 15,
+    "speculative_enabled": True,
+    "speculative_stable_ms": 500,
+    "speculative_max_distance": 0.1,
     "dwell_time": 1.5,
     "gaze_enabled": False,
     "gaze_smoothing": 5,
@@ -27,6 +46,10 @@ DEFAULTS = {
     "overlay_position": "top-right",
     "sample_rate": 16000,
     "audio_block_size": 8000,
+    "audio_low_latency": True,
+    "audio_capture_ms": 20,
+    "audio_speech_chunk_ms": 40,
+    "audio_idle_chunk_ms": 300,
     "failsafe_enabled": True,
     "mouse_move_speed": 0.3,
     "gemini_api_key_env": "GEMINI_API_KEY",
@@ -34,8 +57,45 @@ DEFAULTS = {
     "gemini_temperature": 0.1,
     "gemini_max_tokens": 512,
     "llm_mode": "hybrid",
+    "cascade_small_model": "qwen2.5:0.5b",
+    "cascade_min_confidence": 0.5,
+    "llama_model_path": str(CONFIG_DIR / "models" / "model.gguf"),
+    "llama_n_threads": 0,
+    "llama_n_ctx": 2048,
+    "llama_n_batch": 512,
+    "llama_max_tokens": 128,
     "gemini_fallback_enabled": True,
     "gemini_timeout": 10,
+    "gemini_rpm_limit": 15,
+    "gemini_tpm_limit": 1000000,
+    "gemini_queue_timeout": 0.5,
+    "gemini_quota_backoff": 30,
+    "structured_output": True,
+    "history_token_budget": 200,
+    "history_max_turns": 8,
+    "race_hedge_delay": 0.4,
+    "adaptive_routing_enabled": True,
+    "router_ewma_alpha": 0.3,
+    "router_window": 50,
+    "router_failure_threshold": 3,
+    "router_reset_timeout": 30,
+    "router_probe_interval": 5,
+    "router_prior_latency": 1.0,
+    "router_explore_interval": 60,
+    "fast_path_enabled": True,
+    "intent_splitter_enabled": True,
+    "macro_store_enabled": True,
+    "macro_max_entries": 200,
+    "intent_classifier_enabled": True,
+    "intent_classifier_threshold": 0.9,
+    "intent_classifier_retrain_every": 10,
+    "command_cache_enabled": True,
+    "command_cache_size": 256,
+    "command_cache_ttl": 604800,
+    "semantic_cache_enabled": True,
+    "semantic_cache_size": 512,
+    "semantic_cache_dim": 512,
+    "semantic_cache_threshold": 0.85,
     "ui_mode": "tkinter",
     "websocket_host": "localhost",
     "websocket_port": 8765,
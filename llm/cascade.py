@@ -0,0 +1,54 @@
+"""
+Per-tier statistics for the small-model-first cascade.
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+
+class CascadeStats:
+    """
+    Count how often each cascade tier answered and how long it took
+
+    The small tier "hits" when its answer was accepted; every escalation is
+    counted by reason ("invalid", "clarify", "low_confidence").
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tiers = {
+            tier: {"requests": 0, "hits": 0, "latency": 0.0} for tier in ("small", "large")
+        }
+        self._escalations: Dict[str, int] = {}
+
+    def record(self, tier: str, latency: float, accepted: bool, reason: Optional[str] = None):
+        """
+        Record one call to a tier
+
+        Args:
+            tier: "small" or "large"
+            latency: Seconds the tier took
+            accepted: Whether its answer was used
+            reason: Why the small tier's answer was escalated
+        """
+        with self._lock:
+            stats = self._tiers[tier]
+            stats["requests"] += 1
+            stats["hits"] += accepted
+            stats["latency"] += latency
+            if reason:
+                self._escalations[reason] = self._escalations.get(reason, 0) + 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            report: Dict[str, Any] = {}
+            for tier, stats in self._tiers.items():
+                requests = stats["requests"]
+                report[tier] = {
+                    "requests": requests,
+                    "hits": stats["hits"],
+                    "hit_rate": stats["hits"] / requests if requests else 0.0,
+                    "avg_latency_ms": stats["latency"] / requests * 1000 if requests else None,
+                }
+            report["escalations"] = dict(self._escalations)
+            return report
@@ -0,0 +1,63 @@
+"""
+Action catalog shared by the LLM prompts, the local fast path and validation.
+
+Each entry maps an action name to its parameters. A parameter spec holds the
+JSON type, whether it is required and, optionally, the allowed values.
+"""
+
+from typing import Any, Dict
+
+DIRECTIONS = ["up", "down", "left", "right"]
+
+ACTION_CATALOG: Dict[str, Dict[str, Dict[str, Any]]] = {
+    "open_app": {"target": {"type": "string", "required": True}},
+    "close_app": {"target": {"type": "string", "required": True}},
+    "switch_window": {"target": {"type": "string", "required": True}},
+    "minimize_window": {},
+    "maximize_window": {},
+    "restore_window": {},
+    "mouse_click": {
+        "button": {"type": "string", "enum": ["left", "right", "double"]},
+        "x": {"type": "integer"},
+        "y": {"type": "integer"},
+    },
+    "mouse_move": {
+        "direction": {"type": "string", "enum": DIRECTIONS, "required": True},
+        "distance": {"type": "integer"},
+    },
+    "mouse_move_to": {
+        "x": {"type": "integer", "required": True},
+        "y": {"type": "integer", "required": True},
+    },
+    "scroll": {
+        "direction": {"type": "string", "enum": DIRECTIONS, "required": True},
+        "amount": {"type": "integer"},
+    },
+    "type_text": {"text": {"type": "string", "required": True}},
+    "hotkey": {"keys": {"type": "array", "required": True}},
+    "press_key": {"key": {"type": "string", "required": True}},
+    "show_grid": {},
+    "grid_click": {"cell": {"type": "integer", "required": True}},
+    "hide_grid": {},
+    "volume": {
+        "level": {
+            "type": "string",
+            "enum": ["up", "down", "mute", "unmute"],
+            "required": True,
+        }
+    },
+    "screenshot": {},
+    "lock_screen": {},
+    "search": {"query": {"type": "string", "required": True}},
+    "dictate": {"text": {"type": "string", "required": True}},
+    "start_gaze": {},
+    "stop_gaze": {},
+    "calibrate_gaze": {},
+    "help": {},
+    "stop": {},
+    "confirm": {},
+    "cancel": {},
+    "clarify": {"message": {"type": "string", "required": True}},
+    "error": {"message": {"type": "string", "required": True}},
+}
+
@@ -0,0 +1,176 @@
+"""
+Normalized command -> action cache with LRU + TTL eviction and disk persistence.
+"""
+
+import copy
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import CONFIG_DIR, config
+from llm.normalize import normalize_command
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILE = CONFIG_DIR / "command_cache.json"
+
+# Results that depend on the moment they were produced and must not be replayed
+UNCACHEABLE_ACTIONS = {"clarify", "error", "confirm", "cancel", "stop"}
+
+# Commands that refer back to earlier context resolve differently each time
+REFERENTIAL_WORDS = {"it", "that", "this", "again", "same", "previous", "last", "them"}
+
+
+class CommandCache:
+    """
+    LRU cache of LLM results keyed on the normalized command text
+
+    Entries expire after ``ttl`` seconds and the least recently used entry is
+    evicted once ``max_size`` is exceeded. The cache is written to disk after
+    each change so it survives restarts.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_size: Optional[int] = None,
+        ttl: Optional[float] = None,
+    ):
+        self._path = Path(path) if path else CACHE_FILE
+        self._max_size = max_size if max_size is not None else config.command_cache_size
+        self._ttl = ttl if ttl is not None else config.command_cache_ttl
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._bypassed = 0
+        self._load()
+
+    def _load(self):
+        if not self._path.exists():
+            return
+        try:
+            with open(self._path, "r") as f:
+                stored = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning("Ignoring unreadable command cache %s: %s", self._path, e)
+            return
+
+        now = time.time()
+        for key, entry in stored.get("entries", []):
+            if now - entry.get("created", 0) < self._ttl:
+                self._entries[key] = entry
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+        logger.info("Loaded %d cached commands", len(self._entries))
+
+    def _save(self):
+        # Write to a temp file and rename so a crash never leaves a torn cache
+        tmp_path = self._path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"entries": list(self._entries.items())}, f)
+            os.replace(tmp_path, self._path)
+        except IOError as e:
+            logger.warning("Failed to persist command cache: %s", e)
+
+    @staticmethod
+    def is_cacheable(key: str, result: Dict[str, Any]) -> bool:
+        """Whether a result for this normalized command may be replayed later"""
+        if not key or REFERENTIAL_WORDS.intersection(key.split()):
+            return False
+        if result.get("workflow"):
+            steps = result.get("steps") or []
+            return bool(steps) and all(
+                step.get("action") not in UNCACHEABLE_ACTIONS for step in steps
+            )
+        return "action" in result and result["action"] not in UNCACHEABLE_ACTIONS
+
+    def get(self, command_text: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached result
+
+        Args:
+            command_text: The raw voice command text
+
+        Returns:
+            Copy of the cached action/workflow, or None on a miss
+        """
+        key = normalize_command(command_text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            if time.time() - entry["created"] >= self._ttl:
+                del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            entry["hits"] = entry.get("hits", 0) + 1
+            self._hits += 1
+            return copy.deepcopy(entry["result"])
+
+    def put(self, command_text: str, result: Dict[str, Any]) -> bool:
+        """
+        Store a result unless it matches a bypass rule
+
+        Returns:
+            True if the result was cached
+        """
+        key = normalize_command(command_text)
+        if not self.is_cacheable(key, result):
+            with self._lock:
+                self._bypassed += 1
+            return False
+
+        stored = {k: v for k, v in result.items() if k != "metadata"}
+        with self._lock:
+            self._entries[key] = {"result": stored, "created": time.time(), "hits": 0}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+            self._save()
+        return True
+
+    def invalidate(self, command_text: str) -> bool:
+        """Drop a single command from the cache"""
+        key = normalize_command(command_text)
+        with self._lock:
+            if self._entries.pop(key, None) is None:
+                return False
+            self._save()
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._save()
+
+    def items(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """(normalized command, result) pairs of all live entries"""
+        now = time.time()
+        with self._lock:
+            return [
+                (key, copy.deepcopy(entry["result"]))
+                for key, entry in self._entries.items()
+                if now - entry["created"] < self._ttl
+            ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and occupancy"""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self._max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "bypassed": self._bypassed,
+                "hit_rate": self._hits / total if total else 0.0,
+            }
@@ -0,0 +1,166 @@
+"""
+Append-only log of user corrections to command interpretations.
+
+Each correction is one JSON line, flushed and fsynced before it is applied,
+so a crash can lose at most a torn last line (dropped on load). The newest
+correction for a normalized command wins; the in-memory index is rebuilt
+from the log at startup.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from config import CONFIG_DIR
+from llm.normalize import normalize_command
+from llm.schema import validate_action
+
+logger = logging.getLogger(__name__)
+
+CORRECTIONS_FILE = CONFIG_DIR / "corrections.jsonl"
+
+
+class CorrectionStore:
+    """
+    Corrections indexed by normalized command
+
+    A correction identical to the current one for its command is a duplicate
+    and not written again. A different action for an already corrected
+    command is a conflict: it is logged and the newer correction wins.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self._path = Path(path) if path else CORRECTIONS_FILE
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._duplicates = 0
+        self._conflicts = 0
+        self._load()
+
+    def _load(self):
+        if not self._path.exists():
+            return
+        with open(self._path, "rb") as f:
+            data = f.read()
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            # Drop a torn last line so the next append starts on a fresh line
+            logger.warning("Truncating incomplete last correction in %s", self._path)
+            with open(self._path, "r+b") as f:
+                f.truncate(complete)
+
+        skipped = 0
+        for line in data[:complete].decode("utf-8", errors="replace").splitlines():
+            try:
+                record = json.loads(line)
+                self._index[record["key"]] = record
+            except (json.JSONDecodeError, KeyError, TypeError):
+                skipped += 1
+        if skipped:
+            logger.warning("Skipped %d unreadable lines in %s", skipped, self._path)
+        logger.info("Loaded %d corrections", len(self._index))
+
+    def add(self, command_text: str, action: Dict[str, Any]) -> Tuple[bool, str]:
+        """
+        Record the correct action for a command
+
+        Args:
+            command_text: The command as it was spoken
+            action: The action (or workflow) it should have resolved to
+
+        Returns:
+            Tuple of (stored, message); duplicates and invalid actions are
+            not stored
+        """
+        key = normalize_command(command_text)
+        if not key:
+            return False, "Empty command"
+        action = {k: v for k, v in action.items() if k != "metadata"}
+        problem = validate_action(action)
+        if problem or action.get("action") == "error":
+            return False, f"Invalid correction: {problem or 'error action'}"
+
+        with self._lock:
+            previous = self._index.get(key)
+            if previous is not None and previous["action"] == action:
+                self._duplicates += 1
+                return False, "Duplicate correction"
+            if previous is not None:
+                self._conflicts += 1
+                logger.info(
+                    "Correction for '%s' replaces %s with %s", key, previous["action"], action
+                )
+
+            record = {
+                "key": key,
+                "command": command_text,
+                "action": action,
+                "time": time.time(),
+            }
+            with open(self._path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._index[key] = record
+        return True, "Correction stored"
+
+    def get(self, command_text: str) -> Optional[Dict[str, Any]]:
+        """Current correct action for a command, if one was recorded"""
+        with self._lock:
+            record = self._index.get(normalize_command(command_text))
+            return dict(record["action"]) if record else None
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """(normalized command, action) pairs of the current corrections"""
+        with self._lock:
+            records = list(self._index.values())
+        for record in records:
+            yield record["key"], record["action"]
+
+    def export(self, path: Path) -> int:
+        """
+        Write the current (deduplicated, latest-wins) corrections as JSONL
+
+        Each line is ``{"command": ..., "key": ..., "action": ...}``, ready
+        to be used as an offline evaluation set.
+
+        Returns:
+            Number of exported corrections
+        """
+        with self._lock:
+            records = sorted(self._index.values(), key=lambda r: r["time"])
+        with open(path, "w") as f:
+            for record in records:
+                f.write(
+                    json.dumps(
+                        {
+                            "command": record["command"],
+                            "key": record["key"],
+                            "action": record["action"],
+                        }
+                    )
+                    + "\n"
+                )
+        return len(records)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "corrections": len(self._index),
+                "duplicates": self._duplicates,
+                "conflicts": self._conflicts,
+            }
+
+
+if __name__ == "__main__":
+    # python -m llm.corrections export.jsonl
+    if len(sys.argv) != 2:
+        print("Usage: python -m llm.corrections <output.jsonl>")
+        sys.exit(1)
+    count = CorrectionStore().export(Path(sys.argv[1]))
+    print(f"Exported {count} corrections to {sys.argv[1]}")
@@ -0,0 +1,272 @@
+"""
+Rule-based fast path that resolves deterministic commands without an LLM.
+
+Phrases are compiled into a token trie built from the "Common mappings" in the
+system prompts, the application aliases and the action catalog. A phrase may
+contain typed slots (``{cell:int}``, ``{text:text}``) whose captured values are
+written into the emitted action under the slot name.
+"""
+
+import copy
+import json
+import logging
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from actions.desktop import APP_ALIASES
+from llm.catalog import ACTION_CATALOG, DIRECTIONS
+from llm.gemini_processor import GEMINI_SYSTEM_PROMPT
+from llm.normalize import command_spans, parse_number, tokenize
+from llm.processor import SYSTEM_PROMPT
+
+logger = logging.getLogger(__name__)
+
+# Spoken key names mapped to pyautogui key names
+PRESSABLE_KEYS = {
+    "enter": "enter", "return": "enter", "tab": "tab", "escape": "escape",
+    "space": "space", "backspace": "backspace", "delete": "delete",
+    "home": "home", "end": "end", "page up": "pageup", "page down": "pagedown",
+    "up": "up", "down": "down", "left": "left", "right": "right",
+    "up arrow": "up", "down arrow": "down", "left arrow": "left",
+    "right arrow": "right",
+}
+
+_MAPPING_RE = re.compile(r'^- "(?P<phrase>[^"]+)" → (?P<action>\{.*\})\s*$', re.M)
+_SLOT_RE = re.compile(r"^\{(?P<name>\w+):(?P<kind>int|text)\}$")
+
+
+class _TrieNode:
+    __slots__ = ("children", "slots", "action")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.slots: List[Tuple[str, str, "_TrieNode"]] = []
+        self.action: Optional[Dict[str, Any]] = None
+
+
+def _prompt_mappings() -> List[Tuple[str, Dict[str, Any]]]:
+    """Extract the "Common mappings" section of both system prompts."""
+    mappings = []
+    for prompt in (SYSTEM_PROMPT, GEMINI_SYSTEM_PROMPT):
+        for match in _MAPPING_RE.finditer(prompt):
+            try:
+                action = json.loads(match.group("action"))
+            except ValueError:
+                continue
+            mappings.append((match.group("phrase"), action))
+    return mappings
+
+
+def _catalog_phrases() -> List[Tuple[str, Dict[str, Any]]]:
+    """Phrases for catalog actions, app aliases and slot-bearing commands."""
+    phrases: List[Tuple[str, Dict[str, Any]]] = []
+
+    # Parameterless actions are addressable by their own name ("show grid")
+    for name, params in ACTION_CATALOG.items():
+        if not params:
+            phrases.append((name.replace("_", " "), {"action": name}))
+
+    for app in APP_ALIASES:
+        for verb in ("open", "launch", "start", "run"):
+            phrases.append((f"{verb} {app}", {"action": "open_app", "target": app}))
+        for verb in ("close", "quit", "exit"):
+            phrases.append((f"{verb} {app}", {"action": "close_app", "target": app}))
+        for verb in ("switch to", "go to", "focus"):
+            phrases.append(
+                (f"{verb} {app}", {"action": "switch_window", "target": app})
+            )
+
+    for direction in DIRECTIONS:
+        phrases.append((f"scroll {direction}", {"action": "scroll", "direction": direction}))
+        phrases.append(
+            (
+                f"scroll {direction} {{amount:int}}",
+                {"action": "scroll", "direction": direction},
+            )
+        )
+        for verb in ("move mouse", "move the mouse", "mouse"):
+            phrases.append(
+                (
+                    f"{verb} {direction}",
+                    {"action": "mouse_move", "direction": direction, "distance": 100},
+                )
+            )
+
+    for level in ("up", "down", "mute", "unmute"):
+        phrases.append((f"volume {level}", {"action": "volume", "level": level}))
+        phrases.append((f"turn volume {level}", {"action": "volume", "level": level}))
+    phrases.append(("mute", {"action": "volume", "level": "mute"}))
+    phrases.append(("unmute", {"action": "volume", "level": "unmute"}))
+
+    for button, words in (
+        ("left", ("click", "left click")),
+        ("right", ("right click",)),
+        ("double", ("double click",)),
+    ):
+        for word in words:
+            phrases.append((word, {"action": "mouse_click", "button": button}))
+
+    phrases.extend(
+        [
+            ("click {cell:int}", {"action": "grid_click"}),
+            ("click cell {cell:int}", {"action": "grid_click"}),
+            ("grid {cell:int}", {"action": "grid_click"}),
+            ("cell {cell:int}", {"action": "grid_click"}),
+            ("show the grid", {"action": "show_grid"}),
+            ("hide the grid", {"action": "hide_grid"}),
+            ("take a screenshot", {"action": "screenshot"}),
+            ("take screenshot", {"action": "screenshot"}),
+            ("minimize", {"action": "minimize_window"}),
+            ("maximize", {"action": "maximize_window"}),
+            ("restore", {"action": "restore_window"}),
+            ("start eye tracking", {"action": "start_gaze"}),
+            ("stop eye tracking", {"action": "stop_gaze"}),
+            ("calibrate", {"action": "calibrate_gaze"}),
+            ("stop assistant", {"action": "stop"}),
+            ("type {text:text}", {"action": "type_text"}),
+            ("dictate {text:text}", {"action": "dictate"}),
+            ("search for {query:text}", {"action": "search"}),
+            ("search {query:text}", {"action": "search"}),
+            ("what can you do", {"action": "help"}),
+        ]
+    )
+
+    for spoken, key in PRESSABLE_KEYS.items():
+        phrases.append((f"press {spoken}", {"action": "press_key", "key": key}))
+    for key in ("enter", "escape", "tab", "backspace"):
+        phrases.append((key, {"action": "press_key", "key": key}))
+    return phrases
+
+
+def builtin_phrases() -> List[Tuple[str, Dict[str, Any]]]:
+    """All built-in phrases; prompt mappings last so they take precedence"""
+    return _catalog_phrases() + _prompt_mappings()
+
+
+class FastPathResolver:
+    """
+    Resolve common commands to action dicts locally via a compiled phrase trie
+
+    Literal edges take priority over slots, so "search for cats" fills the
+    query of ``search for {query:text}`` rather than ``search {query:text}``.
+    Text slots keep the command's original wording and punctuation.
+    """
+
+    def __init__(self):
+        self._root = _TrieNode()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._phrase_count = 0
+
+        # Prompt mappings go last so they override generic catalog phrases
+        # such as "task manager" (hotkey, not the app alias)
+        for phrase, action in builtin_phrases():
+            self.add_phrase(phrase, action)
+
+        logger.info("Fast path compiled with %d phrases", self._phrase_count)
+
+    def add_phrase(self, phrase: str, action: Dict[str, Any]):
+        """
+        Compile a phrase into the trie
+
+        Args:
+            phrase: Space separated words, optionally with ``{name:int|text}`` slots
+            action: Action dict emitted on a match; slot values are added to it
+        """
+        node = self._root
+        for word in phrase.split():
+            slot = _SLOT_RE.match(word)
+            if slot:
+                name, kind = slot.group("name"), slot.group("kind")
+                for slot_name, slot_kind, child in node.slots:
+                    if slot_name == name and slot_kind == kind:
+                        node = child
+                        break
+                else:
+                    child = _TrieNode()
+                    node.slots.append((name, kind, child))
+                    node = child
+            else:
+                for token in tokenize(word) or [word]:
+                    node = node.children.setdefault(token, _TrieNode())
+        if node.action is None:
+            self._phrase_count += 1
+        node.action = dict(action)
+
+    def _match(
+        self,
+        node: _TrieNode,
+        spans: List[Tuple[str, int]],
+        text: str,
+        pos: int,
+        slots: Dict[str, Any],
+    ):
+        if pos == len(spans):
+            return (node.action, slots) if node.action is not None else None
+
+        token = spans[pos][0]
+        child = node.children.get(token)
+        if child is not None:
+            found = self._match(child, spans, text, pos + 1, slots)
+            if found:
+                return found
+
+        for name, kind, child in node.slots:
+            if kind == "int":
+                value = parse_number(token)
+                if value is None:
+                    continue
+                found = self._match(child, spans, text, pos + 1, {**slots, name: value})
+            else:
+                # Text slots consume the rest of the utterance, as spoken
+                value = text[spans[pos][1]:].strip()
+                found = self._match(child, spans, text, len(spans), {**slots, name: value})
+            if found:
+                return found
+        return None
+
+    def resolve(self, command_text: str) -> Optional[Dict[str, Any]]:
+        """
+        Resolve a command to an action dict without calling an LLM
+
+        Args:
+            command_text: The voice command text
+
+        Returns:
+            Action dict for deterministic phrases, None if the LLM is needed
+        """
+        spans = command_spans(command_text)
+        found = self._match(self._root, spans, command_text, 0, {}) if spans else None
+
+        with self._lock:
+            if found:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+        if not found:
+            return None
+
+        action, slots = found
+        result = copy.deepcopy(action)
+        result.update(slots)
+        logger.info("Fast path resolved '%s' -> %s", command_text, result)
+        return result
+
+    def head_words(self) -> set:
+        """First words of all compiled phrases (e.g. "open", "copy", "scroll")"""
+        with self._lock:
+            return set(self._root.children)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for the fast path"""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "phrases": self._phrase_count,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / total if total else 0.0,
+            }
@@ -3,6 +3,9 @@ import json
 import logging
 from typing import Dict, List, Optional, Any
 from config import config
+from llm.history import ConversationHistory, estimate_tokens
+from llm.rate_limiter import RateLimiter
+from llm.schema import GEMINI_RESPONSE_SCHEMA, invalid_output_error, validate_action
 
 logger = logging.getLogger(__name__)
 
@@ -87,13 +90,46 @@ Examples of multi-step workflows:
 """
 
 
-class GeminiProcessor:
-    """Gemini API client for processing voice commands into actions"""
+# Typical size of an action answer, until the response reports its usage
+OUTPUT_TOKENS_ESTIMATE = 64
+
+
+def _is_quota_error(error: Exception) -> bool:
+    """HTTP 429 / ResourceExhausted from the Gemini API"""
+    text = str(error).lower()
+    return (
+        type(error).__name__ == "ResourceExhausted"
+        or "429" in text
+        or "quota" in text
+        or "rate limit" in text
+    )
+
 
-    def __init__(self):
+def rate_limited_error(message: str) -> Dict[str, Any]:
+    """Error result that routing treats as "try elsewhere", not as a failure"""
+    return {"action": "error", "message": message, "metadata": {"rate_limited": True}}
+
+
+class GeminiProcessor:
+    """
+    Gemini API client for processing voice commands into actions
+
+    Requests pass a token-bucket rate limiter sized to the API quota
+    (config.gemini_rpm_limit, config.gemini_tpm_limit). A request that
+    cannot be sent within config.gemini_queue_timeout is refused at once
+    with a ``rate_limited`` error so the caller can use Ollama instead; a
+    quota error from the server empties the buckets for
+    config.gemini_quota_backoff seconds.
+    """
+
+    def __init__(self, history: Optional[ConversationHistory] = None):
         self._api_key = None
         self._model = None
-        self._conversation = []
+        # A shared history is recorded by its owner (the hybrid processor)
+        self._owns_history = history is None
+        self._history = history if history is not None else ConversationHistory()
+        self._limiter = RateLimiter(config.gemini_rpm_limit, config.gemini_tpm_limit)
+        self._prompt_tokens = estimate_tokens(GEMINI_SYSTEM_PROMPT)
         self._available = False
         self._initialize()
 
@@ -125,6 +161,10 @@ class GeminiProcessor:
                 "temperature": config.gemini_temperature,
                 "max_output_tokens": config.gemini_max_tokens,
             }
+            if config.structured_output:
+                # Constrain output to JSON matching the action catalog
+                generation_config["response_mime_type"] = "application/json"
+                generation_config["response_schema"] = GEMINI_RESPONSE_SCHEMA
 
             self._model = genai.GenerativeModel(
                 model_name=config.gemini_model,
@@ -160,36 +200,57 @@ class GeminiProcessor:
             }
 
         try:
-            # Add command to conversation history (keep last 6 exchanges)
-            messages = self._conversation[-6:]
+            # Earlier turns only go along when the command refers back to them
+            contents = [
+                {
+                    "role": "model" if m["role"] == "assistant" else "user",
+                    "parts": [m["content"]],
+                }
+                for m in self._history.context(command_text)
+            ]
+            contents.append({"role": "user", "parts": [command_text]})
+
+            estimated = (
+                self._prompt_tokens
+                + sum(estimate_tokens(c["parts"][0]) for c in contents)
+                + OUTPUT_TOKENS_ESTIMATE
+            )
+            if not self._limiter.acquire(estimated, config.gemini_queue_timeout):
+                logger.info("Gemini rate limit reached, not sending request")
+                return rate_limited_error("Gemini rate limit reached")
 
             # Generate response
             response = self._model.generate_content(
-                command_text, request_options={"timeout": config.gemini_timeout}
+                contents, request_options={"timeout": config.gemini_timeout}
             )
+            usage = getattr(response, "usage_metadata", None)
+            if usage is not None and getattr(usage, "total_token_count", 0):
+                self._limiter.record_usage(estimated, usage.total_token_count)
 
             # Extract text from response
             if not response.text:
-                return {"action": "error", "message": "Gemini returned empty response"}
+                return invalid_output_error("Gemini returned empty response")
 
             raw_response = response.text.strip()
             logger.info(f"Gemini raw response: {raw_response}")
 
-            # Update conversation history
-            self._conversation.append({"role": "user", "content": command_text})
-            self._conversation.append({"role": "assistant", "content": raw_response})
-
-            # Keep conversation history manageable
-            if len(self._conversation) > 20:
-                self._conversation = self._conversation[-12:]
-
             # Parse JSON response
-            return self._parse_response(raw_response)
+            result = self._parse_response(raw_response)
+            if self._owns_history:
+                self._history.add(command_text, result)
+            return result
 
         except Exception as e:
+            if _is_quota_error(e):
+                self._limiter.on_quota_error(config.gemini_quota_backoff)
+                return rate_limited_error(f"Gemini quota exceeded: {e}")
             logger.error(f"Gemini API error: {e}")
             return {"action": "error", "message": f"Gemini API error: {str(e)}"}
 
+    def get_quota_stats(self) -> Dict[str, Any]:
+        """Rate limiter utilization and rejections"""
+        return self._limiter.get_stats()
+
     def _parse_response(self, response_text: str) -> Dict[str, Any]:
         """
         Parse Gemini response into action dict
@@ -198,6 +259,8 @@ class GeminiProcessor:
         - Plain JSON: {"action": "..."}
         - JSON in markdown code blocks: ```json {...} ```
         - Workflow responses: {"workflow": true, "steps": [...]}
+
+        The result is checked with the precompiled action validator.
         """
         text = response_text.strip()
 
@@ -208,52 +271,34 @@ class GeminiProcessor:
             text = "\n".join(lines).strip()
 
         # Try to parse as JSON directly
+        result = None
         try:
             result = json.loads(text)
-            if isinstance(result, dict):
-                # Validate it has required fields
-                if "workflow" in result and result["workflow"]:
-                    # Multi-step workflow
-                    if "steps" in result and isinstance(result["steps"], list):
-                        return result
-                    else:
-                        return {
-                            "action": "error",
-                            "message": "Invalid workflow format: missing 'steps' array",
-                        }
-                elif "action" in result:
-                    # Single action
-                    return result
-                else:
-                    return {
-                        "action": "error",
-                        "message": "Response missing 'action' or 'workflow' field",
-                    }
         except json.JSONDecodeError:
-            pass
-
-        # Try to extract JSON from text (find first { to last })
-        start = text.find("{")
-        end = text.rfind("}")
-        if start != -1 and end != -1:
-            try:
-                result = json.loads(text[start : end + 1])
-                if isinstance(result, dict) and (
-                    "action" in result or "workflow" in result
-                ):
-                    return result
-            except json.JSONDecodeError:
-                pass
-
-        # Failed to parse
-        return {
-            "action": "error",
-            "message": f"Could not parse Gemini response as JSON: {text[:100]}",
-        }
+            # Try to extract JSON from text (find first { to last })
+            start = text.find("{")
+            end = text.rfind("}")
+            if start != -1 and end != -1:
+                try:
+                    result = json.loads(text[start : end + 1])
+                except json.JSONDecodeError:
+                    pass
+
+        if result is None:
+            # Failed to parse
+            return invalid_output_error(
+                f"Could not parse Gemini response as JSON: {text[:100]}"
+            )
+
+        # Validate against the action schema (single action or workflow)
+        problem = validate_action(result)
+        if problem:
+            return invalid_output_error(f"Invalid Gemini response: {problem}")
+        return result
 
     def clear_history(self):
         """Clear conversation history"""
-        self._conversation.clear()
+        self._history.clear()
         logger.info("Gemini conversation history cleared")
 
     def test_connection(self) -> tuple[bool, str]:
@@ -266,6 +311,10 @@ class GeminiProcessor:
         if not self._available:
             return False, "Gemini API not initialized"
 
+        if not self._limiter.acquire(self._prompt_tokens + OUTPUT_TOKENS_ESTIMATE, 0):
+            # Do not spend quota on a health check
+            return True, f"Gemini ({config.gemini_model}) rate limited, test skipped"
+
         try:
             # Simple test request
             response = self._model.generate_content(
@@ -279,4 +328,7 @@ class GeminiProcessor:
                 return False, "Gemini returned empty response"
 
         except Exception as e:
+            if _is_quota_error(e):
+                self._limiter.on_quota_error(config.gemini_quota_backoff)
+                return True, f"Gemini ({config.gemini_model}) quota exceeded"
             return False, f"Connection test failed: {e}"
@@ -0,0 +1,123 @@
+"""
+Token-budgeted conversation history shared by the LLM backends.
+
+Only commands that refer back to earlier turns ("do that again", "close it")
+or answer a clarification question get context; every other request is sent
+without history, so its prompt is the fixed instruction prefix plus the
+command. Context is the newest turns that fit in
+``config.history_token_budget``, each stored as the command and the compact
+JSON of its resolved action instead of the raw model output.
+"""
+
+import json
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from config import config
+from llm.command_cache import REFERENTIAL_WORDS
+from llm.normalize import normalize_command
+
+logger = logging.getLogger(__name__)
+
+# Results that tell a later "do that again" nothing useful
+_NON_REFERENTIAL_ACTIONS = {"error", "confirm", "cancel", "stop"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)"""
+    return len(text) // 4 + 1
+
+
+def is_referential(command_text: str) -> bool:
+    """Whether a command refers back to an earlier turn"""
+    return bool(REFERENTIAL_WORDS.intersection(normalize_command(command_text).split()))
+
+
+class ConversationHistory:
+    """
+    Recent (command, action) turns, handed out only when a command needs them
+
+    Errors and other turns without referential value are not stored.
+    Clarification questions are, and the command after one always gets
+    context, since it is usually a bare answer ("chrome"). ``context``
+    returns user/assistant message pairs, oldest first, newest turns taking
+    priority when the budget is tight.
+    """
+
+    def __init__(self, token_budget: Optional[int] = None, max_turns: Optional[int] = None):
+        self._budget = token_budget if token_budget is not None else config.history_token_budget
+        self._turns = deque(maxlen=max_turns or config.history_max_turns)
+        self._lock = threading.Lock()
+        self._stats = {"with_context": 0, "without_context": 0, "context_tokens": 0}
+        self._awaiting_answer = False
+
+    @property
+    def awaiting_answer(self) -> bool:
+        """The last stored turn asked the user a clarification question"""
+        return self._awaiting_answer
+
+    def add(self, command_text: str, result: Dict[str, Any]):
+        """Store a resolved command, dropping turns with no referential value"""
+        # Any command, stored or not, answers a pending clarification
+        self._awaiting_answer = result.get("action") == "clarify"
+        if result.get("action") in _NON_REFERENTIAL_ACTIONS:
+            return
+        action = {k: v for k, v in result.items() if k != "metadata"}
+        if not action:
+            return
+        response = json.dumps(action, separators=(",", ":"))
+        turn = {
+            "command": command_text,
+            "response": response,
+            "tokens": estimate_tokens(command_text) + estimate_tokens(response),
+        }
+        with self._lock:
+            self._turns.append(turn)
+
+    def context(self, command_text: str) -> List[Dict[str, str]]:
+        """
+        History messages to send with a command
+
+        Returns:
+            Alternating user/assistant messages, or an empty list if the
+            command neither refers back nor answers a clarification
+        """
+        if not self._awaiting_answer and not is_referential(command_text):
+            with self._lock:
+                self._stats["without_context"] += 1
+            return []
+
+        with self._lock:
+            selected = []
+            tokens = 0
+            for turn in reversed(self._turns):
+                if tokens + turn["tokens"] > self._budget:
+                    break
+                selected.append(turn)
+                tokens += turn["tokens"]
+            self._stats["with_context"] += 1
+            self._stats["context_tokens"] += tokens
+
+        messages = []
+        for turn in reversed(selected):
+            messages.append({"role": "user", "content": turn["command"]})
+            messages.append({"role": "assistant", "content": turn["response"]})
+        return messages
+
+    def clear(self):
+        with self._lock:
+            self._turns.clear()
+            self._awaiting_answer = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["turns"] = len(self._turns)
+            stats["tokens"] = sum(t["tokens"] for t in self._turns)
+        context_tokens = stats.pop("context_tokens")
+        stats["avg_context_tokens"] = (
+            context_tokens / stats["with_context"] if stats["with_context"] else 0.0
+        )
+        return stats
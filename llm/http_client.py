@@ -0,0 +1,179 @@
+"""
+Shared pooled HTTP client for the LLM backends.
+
+All HTTP traffic to inference servers goes through one keep-alive session so
+the TCP handshake is paid once per host instead of once per command.
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Sockets opened by the current thread; requests run on the caller's thread,
+# so the delta across one request tells whether its connection was reused
+_connects = threading.local()
+
+
+def _count_connect():
+    _connects.count = getattr(_connects, "count", 0) + 1
+
+
+class _CountingHTTPConnection(HTTPConnection):
+    def connect(self):
+        _count_connect()
+        super().connect()
+
+
+class _CountingHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        _count_connect()
+        super().connect()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+
+class _CountingAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+class HTTPClient:
+    """
+    Pooled keep-alive HTTP session with per-host limits and reuse statistics
+
+    Each host gets a connection pool of ``max_per_host`` connections; callers
+    block once a host's pool is exhausted instead of opening more sockets.
+    Timeouts are split into connect and read parts so an unreachable server
+    fails fast while a slow generation can still complete.
+    """
+
+    def __init__(
+        self,
+        max_hosts: Optional[int] = None,
+        max_per_host: Optional[int] = None,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+    ):
+        self._connect_timeout = connect_timeout or config.http_connect_timeout
+        self._read_timeout = read_timeout or config.http_read_timeout
+        self._max_per_host = max_per_host or config.http_max_per_host
+
+        self._adapter = _CountingAdapter(
+            pool_connections=max_hosts or config.http_max_hosts,
+            pool_maxsize=self._max_per_host,
+            pool_block=True,
+            max_retries=0,
+        )
+        self._session = requests.Session()
+        self._session.mount("http://", self._adapter)
+        self._session.mount("https://", self._adapter)
+
+        self._stats_lock = threading.Lock()
+        self._host_stats: Dict[str, Dict[str, int]] = {}
+
+    def _timeout(self, read_timeout: Optional[float]) -> Tuple[float, float]:
+        return (self._connect_timeout, read_timeout or self._read_timeout)
+
+    def request(
+        self, method: str, url: str, read_timeout: Optional[float] = None, **kwargs
+    ) -> requests.Response:
+        """
+        Send a request over the pooled session
+
+        Args:
+            method: HTTP method
+            url: Absolute URL
+            read_timeout: Override for the read timeout in seconds
+            **kwargs: Passed through to requests (json, stream, ...)
+
+        Returns:
+            The response; streamed responses must be closed by the caller
+        """
+        opened_before = getattr(_connects, "count", 0)
+        try:
+            resp = self._session.request(
+                method, url, timeout=self._timeout(read_timeout), **kwargs
+            )
+        finally:
+            reused = getattr(_connects, "count", 0) == opened_before
+            self._record(urlsplit(url).netloc, reused)
+        return resp
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def _record(self, host: str, reused: bool):
+        with self._stats_lock:
+            stats = self._host_stats.setdefault(
+                host, {"requests": 0, "reused": 0, "new_connections": 0}
+            )
+            stats["requests"] += 1
+            if reused:
+                stats["reused"] += 1
+            else:
+                stats["new_connections"] += 1
+
+    def warmup(self, base_url: str) -> bool:
+        """
+        Open a connection to a host ahead of the first real request
+
+        Returns:
+            True if the host answered
+        """
+        try:
+            resp = self.get(base_url, read_timeout=self._connect_timeout)
+            resp.close()
+            logger.info("Warmed HTTP connection to %s", base_url)
+            return True
+        except requests.RequestException as e:
+            logger.warning("HTTP warmup to %s failed: %s", base_url, e)
+            return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-host request counts and connection reuse ratio"""
+        with self._stats_lock:
+            hosts = {host: dict(stats) for host, stats in self._host_stats.items()}
+        for stats in hosts.values():
+            stats["reuse_rate"] = (
+                stats["reused"] / stats["requests"] if stats["requests"] else 0.0
+            )
+        return hosts
+
+    def close(self):
+        self._session.close()
+
+
+_client: Optional[HTTPClient] = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HTTPClient:
+    """Process-wide shared HTTP client"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HTTPClient()
+        return _client
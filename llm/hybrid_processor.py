@@ -1,8 +1,26 @@
 import logging
-from typing import Dict, Any, Optional
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Any, Optional
 from config import config
+from llm.cascade import CascadeStats
+from llm.command_cache import CommandCache
+from llm.corrections import CorrectionStore
+from llm.fast_path import FastPathResolver
 from llm.gemini_processor import GeminiProcessor
+from llm.history import ConversationHistory
+from llm.http_client import get_http_client
+from llm.intent_classifier import IntentClassifier
+from llm.intent_splitter import IntentSplitter
+from llm.llama_cpp_processor import LlamaCppProcessor
+from llm.macro_store import MacroStore
+from llm.normalize import normalize_command
+from llm.ollama_pool import parse_hosts
 from llm.processor import LLMProcessor
+from llm.router import AdaptiveRouter
+from llm.schema import is_valid_action
+from llm.semantic_cache import SemanticCache
 
 logger = logging.getLogger(__name__)
 
@@ -19,28 +37,90 @@ class HybridLLMProcessor:
     Mode configuration via config.llm_mode:
     - "gemini": Use Gemini only (fail if unavailable)
     - "ollama": Use Ollama only (ignore Gemini)
-    - "hybrid": Try Gemini first, fallback to Ollama
+    - "hybrid": Route to the backend with the best expected latency, falling
+      back to the other one (static Gemini-first order when
+      config.adaptive_routing_enabled is off)
+    - "race": Send to Gemini, hedge to Ollama after config.race_hedge_delay;
+      the first valid answer wins
+    - "local": In-process llama.cpp model (config.llama_model_path)
+    - "cascade": A small Ollama model (config.cascade_small_model) answers
+      first; invalid, clarify or low-confidence answers escalate to the
+      hybrid route over the larger model and Gemini
+
+    Gemini requests that would exceed the API quota are refused by its rate
+    limiter before they are sent and go to Ollama instead; they do not count
+    as Gemini failures for routing.
+
+    Deterministic commands ("copy", "scroll down") are resolved by the local
+    fast path before any LLM is consulted (config.fast_path_enabled), and
+    repeated commands are served from the normalized command cache
+    (config.command_cache_enabled) or, for paraphrases, the semantic cache
+    (config.semantic_cache_enabled). Compound commands are split into
+    segments and only the segments those layers miss go to the LLM
+    (config.intent_splitter_enabled). Workflows that executed successfully
+    are recorded as macros and replayed without the LLM
+    (config.macro_store_enabled). A local intent classifier trained on past
+    answers and corrections handles confident predictions
+    (config.intent_classifier_enabled).
+
+    All backends share one token-budgeted conversation history, filled with
+    every resolved command whichever layer answered it; it is only sent
+    along with commands that refer back ("do that again", "close it").
     """
 
     def __init__(self):
         self._gemini = None
         self._ollama = None
+        self._local = None
+        self._small = None
+        self._cascade_stats = CascadeStats()
+        self._history = ConversationHistory()
         self._active_processor = None
         self._last_used = None
+        self._fast_path = FastPathResolver() if config.fast_path_enabled else None
+        self._cache = CommandCache() if config.command_cache_enabled else None
+        self._semantic_cache = SemanticCache() if config.semantic_cache_enabled else None
+        self._macros = MacroStore() if config.macro_store_enabled else None
+        self._corrections = CorrectionStore()
+        self._apply_corrections()
+        self._classifier = None
+        if config.intent_classifier_enabled:
+            self._classifier = IntentClassifier()
+            if self._cache:
+                self._classifier.add_examples(self._cache.items())
+            self._classifier.add_examples(list(self._corrections.items()))
+            self._classifier.train_async()
+        self._splitter = (
+            IntentSplitter(self._fast_path, self._cache)
+            if config.intent_splitter_enabled
+            else None
+        )
+        self._router = AdaptiveRouter()
+        self._race_executor = ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix="LLMRace"
+        )
 
         # Initialize processors based on mode
         self._initialize_processors()
 
     def _initialize_processors(self):
-        """Initialize Gemini and/or Ollama processors based on config"""
+        """
+        Initialize the processors the configured mode needs
+
+        Processors that already exist are kept, so switching modes at
+        runtime only creates what the new mode adds.
+        """
         mode = config.llm_mode
 
-        if mode in ("gemini", "hybrid"):
+        if mode in ("gemini", "hybrid", "race", "cascade") and not self._gemini:
             # Try to initialize Gemini
             try:
-                self._gemini = GeminiProcessor()
+                self._gemini = GeminiProcessor(history=self._history)
                 if self._gemini.is_available():
                     logger.info("Gemini processor initialized and available")
+                    self._router.register(
+                        "gemini", lambda: self._gemini.test_connection()[0]
+                    )
                 else:
                     logger.warning(
                         "Gemini processor initialized but not available (missing API key or error)"
@@ -50,15 +130,39 @@ class HybridLLMProcessor:
                 logger.error(f"Failed to initialize Gemini processor: {e}")
                 self._gemini = None
 
-        if mode in ("ollama", "hybrid"):
+        if mode in ("ollama", "hybrid", "race", "cascade") and not self._ollama:
             # Initialize Ollama
             try:
-                self._ollama = LLMProcessor()
+                self._ollama = LLMProcessor(history=self._history)
                 logger.info("Ollama processor initialized")
+                self._router.register("ollama", lambda: self._ollama.check_connection()[0])
             except Exception as e:
                 logger.error(f"Failed to initialize Ollama processor: {e}")
                 self._ollama = None
 
+        if mode == "cascade" and not self._small:
+            # First cascade tier; logprobs give its answers a confidence
+            try:
+                self._small = LLMProcessor(
+                    model=config.cascade_small_model, logprobs=True, history=self._history
+                )
+                logger.info(f"Cascade small model: {config.cascade_small_model}")
+            except Exception as e:
+                logger.error(f"Failed to initialize cascade small model: {e}")
+                self._small = None
+
+        if mode == "local" and not self._local:
+            # In-process llama.cpp model
+            try:
+                self._local = LlamaCppProcessor(history=self._history)
+                if not self._local.is_available():
+                    self._local = None
+            except Exception as e:
+                logger.error(f"Failed to initialize local processor: {e}")
+                self._local = None
+
+        self._router.start()
+
         # Select active processor
         self._select_active_processor()
 
@@ -88,26 +192,54 @@ class HybridLLMProcessor:
                 self._last_used = None
                 logger.error("Ollama not available in ollama-only mode")
 
-        elif mode == "hybrid":
+        elif mode == "local":
+            # In-process llama.cpp mode
+            if self._local:
+                self._active_processor = self._local
+                self._last_used = "local"
+                logger.info("Active processor: llama.cpp (local mode)")
+            else:
+                self._active_processor = None
+                self._last_used = None
+                logger.error("Local llama.cpp model not available in local mode")
+
+        elif mode == "cascade":
+            if self._small:
+                self._active_processor = self._small
+                self._last_used = "small"
+                logger.info("Active processor: small Ollama model (cascade mode)")
+            elif self._gemini or self._ollama:
+                # Without the first tier every command goes to the second one
+                self._active_processor = self._gemini or self._ollama
+                self._last_used = "gemini" if self._gemini else "ollama"
+                logger.warning("Cascade small model unavailable, using the large tier only")
+            else:
+                self._active_processor = None
+                self._last_used = None
+                logger.error("No LLM processor available in cascade mode")
+
+        elif mode in ("hybrid", "race"):
             # Hybrid mode - prefer Gemini, fallback to Ollama
+            # (race mode reports Gemini as active but queries both)
             if self._gemini and self._gemini.is_available():
                 self._active_processor = self._gemini
                 self._last_used = "gemini"
-                logger.info("Active processor: Gemini (hybrid mode, Gemini preferred)")
+                logger.info(f"Active processor: Gemini ({mode} mode, Gemini preferred)")
             elif self._ollama:
                 self._active_processor = self._ollama
                 self._last_used = "ollama"
                 logger.info(
-                    "Active processor: Ollama (hybrid mode, Gemini unavailable)"
+                    f"Active processor: Ollama ({mode} mode, Gemini unavailable)"
                 )
             else:
                 self._active_processor = None
                 self._last_used = None
-                logger.error("No LLM processor available in hybrid mode")
+                logger.error(f"No LLM processor available in {mode} mode")
 
         else:
             logger.error(
-                f"Unknown llm_mode: {mode}. Use 'gemini', 'ollama', or 'hybrid'"
+                f"Unknown llm_mode: {mode}. "
+                "Use 'gemini', 'ollama', 'hybrid', 'race', 'local' or 'cascade'"
             )
             self._active_processor = None
             self._last_used = None
@@ -116,6 +248,125 @@ class HybridLLMProcessor:
         """
         Process a voice command using the active LLM processor
 
+        Args:
+            command_text: The voice command text
+
+        Returns:
+            Dict with action or workflow, or error if no processor available
+        """
+        result = self._resolve(command_text, self._process_with_llm)
+        self.commit_result(command_text, result)
+        return result
+
+    def resolve_speculative(
+        self, command_text: str, cancel_event: Optional[threading.Event] = None
+    ) -> Dict[str, Any]:
+        """
+        Resolve a partial command without side effects
+
+        Nothing is added to the history, caches or classifier, and Gemini is
+        not asked (its rate limit is kept for real commands). Pass the result
+        to :meth:`commit_result` once the final transcript confirms it.
+
+        Args:
+            command_text: The partial command text
+            cancel_event: Optional threading.Event that aborts the local
+                generation once the speculation is no longer wanted
+
+        Returns:
+            Dict with action or workflow, or error if no local backend answered
+        """
+        return self._resolve(
+            command_text, lambda text: self._speculate_with_llm(text, cancel_event)
+        )
+
+    def commit_result(self, command_text: str, result: Dict[str, Any]):
+        """
+        Record a command that is about to be executed
+
+        Adds it to the conversation history; LLM answers are also cached and
+        taught to the intent classifier.
+        """
+        answers_clarify = self._history.awaiting_answer
+        self._history.add(command_text, result)
+        if answers_clarify:
+            # Resolved with the question as context; not reusable on its own
+            return
+        metadata = result.get("metadata", {})
+        source = metadata.get("source")
+        if source == "splitter":
+            if self._cache and metadata["llm_segments"]:
+                self._cache.put(command_text, result)
+        elif source == "llm":
+            if self._cache:
+                self._cache.put(command_text, result)
+            if self._semantic_cache:
+                self._semantic_cache.put(command_text, result)
+            if self._classifier and is_valid_action(result):
+                self._classifier.add_example(command_text, result)
+
+    def _resolve(
+        self, command_text: str, resolve_with_llm: Callable[[str], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Try the local layers in order, then the LLM"""
+        if self._fast_path:
+            result = self._fast_path.resolve(command_text)
+            if result is not None:
+                result["metadata"] = {"source": "fast_path"}
+                return result
+
+        if self._cache:
+            result = self._cache.get(command_text)
+            if result is not None:
+                result["metadata"] = {"source": "cache"}
+                return result
+
+        if self._semantic_cache:
+            result = self._semantic_cache.get(command_text)
+            if result is not None:
+                return result
+
+        if self._macros:
+            result = self._macros.match(command_text)
+            if result is not None:
+                return result
+
+        if self._splitter:
+            result = self._splitter.resolve(command_text, resolve_with_llm)
+            if result is not None:
+                return result
+
+        if self._classifier:
+            result = self._classifier.predict(command_text)
+            if result is not None:
+                return result
+
+        result = resolve_with_llm(command_text)
+        result.setdefault("metadata", {})["source"] = "llm"
+        return result
+
+    def _speculate_with_llm(
+        self, command_text: str, cancel_event: Optional[threading.Event] = None
+    ) -> Dict[str, Any]:
+        """
+        Ask the local backend of the current mode, bypassing the router
+
+        Speculation is thrown away often; it must not spend Gemini quota or
+        skew the router's latency statistics.
+        """
+        name = {"local": "local", "cascade": "small"}.get(config.llm_mode, "ollama")
+        processor = self._backend(name)
+        if processor is None:
+            return {"action": "error", "message": "No local backend for speculation"}
+        try:
+            return processor.process_command(command_text, cancel_event=cancel_event)
+        except Exception as e:
+            return {"action": "error", "message": f"LLM processing error: {e}"}
+
+    def _process_with_llm(self, command_text: str) -> Dict[str, Any]:
+        """
+        Process a command with the active LLM processor, falling back if needed
+
         Args:
             command_text: The voice command text
 
@@ -128,6 +379,17 @@ class HybridLLMProcessor:
                 "message": "No LLM processor available. Check Gemini API key or Ollama connection.",
             }
 
+        if config.llm_mode == "race" and self._gemini and self._ollama:
+            return self._race(command_text)
+
+        if config.llm_mode == "cascade":
+            if self._small:
+                return self._cascade(command_text)
+            return self._route(command_text)
+
+        if config.llm_mode == "hybrid" and config.adaptive_routing_enabled:
+            return self._route(command_text)
+
         # Try active processor
         try:
             result = self._active_processor.process_command(command_text)
@@ -161,6 +423,194 @@ class HybridLLMProcessor:
 
             return {"action": "error", "message": f"LLM processing error: {str(e)}"}
 
+    def _backend(self, name: str):
+        return {
+            "gemini": self._gemini,
+            "ollama": self._ollama,
+            "local": self._local,
+            "small": self._small,
+        }.get(name)
+
+    def _cascade(self, command_text: str) -> Dict[str, Any]:
+        """
+        Try the small model first and escalate only when its answer is unusable
+
+        An answer escalates when it fails validation, asks for clarification
+        or its confidence (least likely token probability) is below
+        config.cascade_min_confidence. Answers without logprobs (older Ollama
+        versions) are judged on validity alone.
+
+        Args:
+            command_text: The voice command text
+
+        Returns:
+            Result from the small model, or from the large tier after escalation
+        """
+        start = time.time()
+        try:
+            result = self._small.process_command(command_text)
+        except Exception as e:
+            logger.error(f"Cascade small model error: {e}")
+            result = {"action": "error", "message": f"LLM processing error: {e}"}
+        small_latency = time.time() - start
+
+        confidence = result.get("metadata", {}).get("confidence")
+        if not is_valid_action(result):
+            reason = "invalid"
+        elif result.get("action") == "clarify":
+            reason = "clarify"
+        elif confidence is not None and confidence < config.cascade_min_confidence:
+            reason = "low_confidence"
+        else:
+            reason = None
+        self._cascade_stats.record("small", small_latency, reason is None, reason)
+
+        if reason is None:
+            self._last_used = "small"
+            result.setdefault("metadata", {})["cascade_tier"] = "small"
+            return result
+
+        logger.info(f"Cascade: escalating '{command_text}' ({reason}, confidence={confidence})")
+        start = time.time()
+        result = self._route(command_text)
+        self._cascade_stats.record("large", time.time() - start, is_valid_action(result))
+        result.setdefault("metadata", {})["cascade_tier"] = "large"
+        result["metadata"]["escalated"] = reason
+        return result
+
+    def _route(self, command_text: str) -> Dict[str, Any]:
+        """
+        Try backends in the adaptive router's order until one succeeds
+
+        Backends whose circuit breaker is open are skipped, so an outage costs
+        a few failed requests instead of a timeout on every command. Only
+        transport errors and timeouts count against the breaker; an answer
+        that fails parsing or validation moves on to the next backend.
+
+        Args:
+            command_text: The voice command text
+
+        Returns:
+            Result from the first backend that answered without an error
+        """
+        candidates = self._router.candidates()
+        if not config.gemini_fallback_enabled:
+            candidates = candidates[:1]
+        if not candidates:
+            return {
+                "action": "error",
+                "message": "All LLM backends are temporarily unavailable",
+            }
+
+        result = None
+        for i, name in enumerate(candidates):
+            start = time.time()
+            try:
+                result = self._backend(name).process_command(command_text)
+            except Exception as e:
+                logger.error(f"{name} processor error: {e}")
+                result = {"action": "error", "message": f"LLM processing error: {e}"}
+
+            metadata = result.get("metadata", {})
+            if metadata.get("rate_limited"):
+                # Refused before (or by) the quota check: not a health problem
+                logger.info(f"{name} rate limited, trying next backend")
+                continue
+            if metadata.get("invalid_output"):
+                # The backend answered; a malformed answer is not an outage
+                self._router.record_invalid(name)
+                logger.warning(f"{name} invalid output: {result.get('message')}")
+                continue
+            success = result.get("action") != "error"
+            self._router.record(name, time.time() - start, success)
+            if success:
+                self._last_used = name
+                if i > 0:
+                    result.setdefault("metadata", {})
+                    result["metadata"]["used_fallback"] = True
+                    result["metadata"]["fallback_from"] = candidates[0]
+                    result["metadata"]["fallback_to"] = name
+                return result
+            logger.warning(f"{name} error: {result.get('message')}")
+
+        return result
+
+    def _race(self, command_text: str) -> Dict[str, Any]:
+        """
+        Query Gemini immediately and hedge to Ollama after a delay
+
+        The first schema-valid answer wins. A losing Ollama stream is aborted
+        via its cancel event; a losing Gemini call cannot be interrupted and
+        its result is discarded.
+
+        Args:
+            command_text: The voice command text
+
+        Returns:
+            The winning result, or the last invalid result if none was valid
+        """
+        start = time.time()
+        deadline = start + config.gemini_timeout
+        cancel_ollama = threading.Event()
+        started = {"gemini": start}
+        pending = {
+            self._race_executor.submit(
+                self._gemini.process_command, command_text
+            ): "gemini"
+        }
+        hedged = False
+        last_result = {"action": "error", "message": "No backend answered in time"}
+
+        while pending:
+            if hedged:
+                timeout = max(0.0, deadline - time.time())
+            else:
+                timeout = max(0.0, start + config.race_hedge_delay - time.time())
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                backend = pending.pop(future)
+                latency = time.time() - started[backend]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.warning(f"Race: {backend} raised {e}")
+                    self._router.record(backend, latency, False)
+                    continue
+                metadata = result.get("metadata", {})
+                if metadata.get("invalid_output"):
+                    self._router.record_invalid(backend)
+                elif not metadata.get("rate_limited"):
+                    self._router.record(backend, latency, is_valid_action(result))
+                if is_valid_action(result):
+                    if backend == "gemini":
+                        cancel_ollama.set()
+                    for loser in pending:
+                        loser.cancel()
+                    elapsed = time.time() - start
+                    logger.info(f"Race won by {backend} in {elapsed:.2f}s")
+                    result.setdefault("metadata", {})
+                    result["metadata"]["race_winner"] = backend
+                    self._last_used = backend
+                    return result
+                last_result = result
+
+            if not hedged and (not done or not pending):
+                # Hedge delay elapsed or Gemini already failed: start Ollama
+                hedged = True
+                started["ollama"] = time.time()
+                pending[
+                    self._race_executor.submit(
+                        self._ollama.process_command, command_text, cancel_ollama
+                    )
+                ] = "ollama"
+            elif hedged and not done:
+                logger.warning("Race: no backend answered before the deadline")
+                break
+
+        cancel_ollama.set()
+        return last_result
+
     def _fallback_to_ollama(self, command_text: str) -> Dict[str, Any]:
         """
         Fallback to Ollama when Gemini fails
@@ -197,6 +647,67 @@ class HybridLLMProcessor:
                 "message": f"Both Gemini and Ollama failed: {str(e)}",
             }
 
+    def _apply_corrections(self):
+        """Serve every recorded correction from the fast path"""
+        if not self._fast_path:
+            return
+        for key, action in self._corrections.items():
+            self._fast_path.add_phrase(key, action)
+
+    def add_correction(self, command_text: str, action: Dict[str, Any]) -> tuple[bool, str]:
+        """
+        Record the correct interpretation of a command
+
+        The correction takes effect immediately: the fast path resolves the
+        command to the corrected action, the command cache is updated and
+        any macro recorded for the command is dropped.
+
+        Args:
+            command_text: The command that was misinterpreted
+            action: The action or workflow it should resolve to
+
+        Returns:
+            Tuple of (stored: bool, message: str)
+        """
+        stored, message = self._corrections.add(command_text, action)
+        if not stored:
+            return stored, message
+
+        corrected = self._corrections.get(command_text)
+        if self._fast_path:
+            self._fast_path.add_phrase(normalize_command(command_text), corrected)
+        if self._cache:
+            self._cache.put(command_text, corrected)
+        if self._semantic_cache:
+            self._semantic_cache.put(command_text, corrected)
+        if self._macros:
+            self._macros.invalidate(normalize_command(command_text))
+        if self._classifier:
+            self._classifier.add_example(command_text, corrected)
+        logger.info(f"Correction applied: '{command_text}' -> {corrected}")
+        return stored, message
+
+    def record_workflow(self, command_text: str, plan: Dict[str, Any], success: bool):
+        """
+        Report how an executed workflow went
+
+        Successful plans are recorded as macros; a failed macro replay
+        invalidates the macro it came from.
+
+        Args:
+            command_text: The voice command that produced the plan
+            plan: The workflow dict returned by process_command
+            success: Whether every step executed
+        """
+        if not self._macros:
+            return
+        metadata = plan.get("metadata", {})
+        if metadata.get("source") == "macro":
+            if not success:
+                self._macros.invalidate(metadata["macro"])
+        elif success:
+            self._macros.record(command_text, plan.get("steps", []))
+
     def get_status(self) -> Dict[str, Any]:
         """
         Get status of all LLM processors
@@ -208,8 +719,24 @@ class HybridLLMProcessor:
             "mode": config.llm_mode,
             "active_processor": self._last_used,
             "gemini_available": self._gemini.is_available() if self._gemini else False,
+            "gemini_quota": self._gemini.get_quota_stats() if self._gemini else None,
             "ollama_available": self._ollama is not None,
+            "local_available": self._local is not None,
             "fallback_enabled": config.gemini_fallback_enabled,
+            "router": self._router.get_stats(),
+            "fast_path": self._fast_path.get_stats() if self._fast_path else None,
+            "cache": self._cache.get_stats() if self._cache else None,
+            "semantic_cache": self._semantic_cache.get_stats() if self._semantic_cache else None,
+            "splitter": self._splitter.get_stats() if self._splitter else None,
+            "macros": self._macros.get_stats() if self._macros else None,
+            "corrections": self._corrections.get_stats(),
+            "classifier": self._classifier.get_stats() if self._classifier else None,
+            "history": self._history.get_stats(),
+            "http": get_http_client().get_stats(),
+            "ollama_model": self._ollama.get_warmth_status() if self._ollama else None,
+            "ollama_prefill": self._ollama.get_prefill_stats() if self._ollama else None,
+            "ollama_pool": self._ollama.get_pool_stats() if self._ollama else None,
+            "cascade": self._cascade_stats.get_stats() if self._small else None,
         }
 
     def check_connection(self) -> tuple[bool, str]:
@@ -226,43 +753,90 @@ class HybridLLMProcessor:
         if self._last_used == "gemini" and self._gemini:
             return self._gemini.test_connection()
 
-        # For Ollama processor
-        if self._last_used == "ollama" and self._ollama:
-            connected, has_model, models = self._ollama.check_connection()
+        # For Ollama processors (the large model or the cascade's small one)
+        if self._last_used in ("ollama", "small") and self._backend(self._last_used):
+            processor = self._backend(self._last_used)
+            model = (
+                config.ollama_model
+                if self._last_used == "ollama"
+                else config.cascade_small_model
+            )
+            connected, has_model, models = processor.check_connection()
             if not connected:
-                return False, f"Cannot connect to Ollama at {config.ollama_url}"
+                hosts = ", ".join(parse_hosts(config.ollama_url))
+                return False, f"Cannot connect to Ollama at {hosts}"
             if not has_model:
                 return (
                     False,
-                    f"Model '{config.ollama_model}' not found. Available: {models}",
+                    f"Model '{model}' not found. Available: {models}",
                 )
-            return True, f"Connected to Ollama ({config.ollama_model})"
+            return True, f"Connected to Ollama ({model})"
+
+        # For the in-process llama.cpp processor
+        if self._last_used == "local" and self._local:
+            return self._local.check_connection()
 
         return False, "Unknown processor state"
 
+    def warm_up(self):
+        """Open connections and preload local models ahead of the first command"""
+        if self._ollama:
+            self._ollama.warm_up()
+        if self._small:
+            self._small.warm_up()
+
+    def shutdown(self):
+        """Stop background maintenance threads"""
+        if self._ollama:
+            self._ollama.shutdown()
+        if self._small:
+            self._small.shutdown()
+        self._router.stop()
+        self._race_executor.shutdown(wait=False, cancel_futures=True)
+
     def clear_history(self):
         """Clear conversation history for all processors"""
         if self._gemini:
             self._gemini.clear_history()
         if self._ollama:
             self._ollama.clear_history()
+        if self._local:
+            self._local.clear_history()
+        if self._small:
+            self._small.clear_history()
+        self._history.clear()
         logger.info("Cleared conversation history for all processors")
 
+    def clear_cache(self):
+        """Drop all cached command results"""
+        if self._cache:
+            self._cache.clear()
+            logger.info("Cleared command cache")
+        if self._semantic_cache:
+            self._semantic_cache.clear()
+
     def switch_mode(self, mode: str) -> bool:
         """
         Switch LLM mode dynamically
 
         Args:
-            mode: "gemini", "ollama", or "hybrid"
+            mode: "gemini", "ollama", "hybrid", "race", "local" or "cascade"
 
         Returns:
             True if switch successful, False otherwise
         """
-        if mode not in ("gemini", "ollama", "hybrid"):
+        if mode not in ("gemini", "ollama", "hybrid", "race", "local", "cascade"):
             logger.error(f"Invalid mode: {mode}")
             return False
 
+        previous = config.llm_mode
         config.set("llm_mode", mode)
-        self._select_active_processor()
+        # Creates the processors the new mode needs and selects the active one
+        self._initialize_processors()
+        if not self._active_processor:
+            logger.error(f"Cannot switch to {mode} mode: no processor available")
+            config.set("llm_mode", previous)
+            self._select_active_processor()
+            return False
         logger.info(f"Switched to {mode} mode")
         return True
@@ -0,0 +1,367 @@
+"""
+Local intent classifier: hashed TF-IDF features and a NumPy softmax model.
+
+The classifier predicts an action "shape" (the action with its slot
+parameters removed, e.g. ``{"action": "open_app"}`` or ``{"action": "hotkey",
+"keys": ["ctrl", "c"]}``) and fills the slots (app, direction, numbers, free
+text) from the command itself. It is trained on the fast-path phrases, the
+command cache (past LLM answers) and the corrections log, and retrained in a
+background thread as new answers arrive. Predictions below
+``config.intent_classifier_threshold`` are left to the LLM.
+
+Run ``python -m llm.intent_classifier`` for an accuracy/latency benchmark.
+"""
+
+import json
+import logging
+import random
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from actions.desktop import APP_ALIASES
+from config import config
+from llm.catalog import ACTION_CATALOG, DIRECTIONS
+from llm.fast_path import builtin_phrases
+from llm.normalize import normalize_command, parse_number
+
+logger = logging.getLogger(__name__)
+
+N_FEATURES = 2 ** 11
+
+# Parameters filled from the command text instead of being part of the label
+SLOT_PARAMS = {
+    "target", "direction", "distance", "amount", "cell", "level", "text", "query", "x", "y",
+}
+
+# Labels the classifier never predicts
+_EXCLUDED_ACTIONS = {"clarify", "error"}
+
+_LEVELS = ("unmute", "mute", "up", "down")
+_APPS = sorted((a.split() for a in APP_ALIASES), key=len, reverse=True)
+_TEXT_LEADS = {"for", "in", "out"}
+
+
+def _hash(feature: str) -> int:
+    return zlib.crc32(feature.encode("utf-8")) % N_FEATURES
+
+
+def featurize(tokens: List[str]) -> Dict[int, float]:
+    """Hashed term counts of word unigrams, bigrams and character trigrams"""
+    counts: Dict[int, float] = {}
+    features = [f"w:{t}" for t in tokens]
+    features += [f"b:{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+    for token in tokens:
+        padded = f"<{token}>"
+        features += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    for feature in features:
+        index = _hash(feature)
+        counts[index] = counts.get(index, 0.0) + 1.0
+    return counts
+
+
+def label_of(action: Dict[str, Any]) -> Optional[str]:
+    """Canonical label of an action, or None if it cannot be a training target"""
+    if action.get("workflow") or action.get("action") not in ACTION_CATALOG:
+        return None
+    if action["action"] in _EXCLUDED_ACTIONS:
+        return None
+    shape = {k: v for k, v in action.items() if k not in SLOT_PARAMS and k != "metadata"}
+    return json.dumps(shape, sort_keys=True)
+
+
+def fill_slots(label: str, tokens: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Complete a predicted action shape with slot values from the command
+
+    Returns:
+        The action, or None if a required slot could not be filled
+    """
+    action = json.loads(label)
+    params = ACTION_CATALOG[action["action"]]
+    numbers = [n for n in (parse_number(t) for t in tokens) if n is not None]
+
+    for param, spec in params.items():
+        if param not in SLOT_PARAMS:
+            continue
+        value = None
+        if param == "target":
+            for app in _APPS:
+                n = len(app)
+                if any(tokens[i : i + n] == app for i in range(len(tokens) - n + 1)):
+                    value = " ".join(app)
+                    break
+        elif param == "direction":
+            value = next((t for t in tokens if t in DIRECTIONS), None)
+        elif param == "level":
+            value = next((t for t in tokens if t in _LEVELS), None)
+        elif param in ("text", "query"):
+            rest = tokens[1:]
+            if rest and rest[0] in _TEXT_LEADS:
+                rest = rest[1:]
+            value = " ".join(rest) or None
+        elif spec["type"] == "integer" and numbers:
+            value = numbers.pop(0)
+
+        if value is not None:
+            action[param] = value
+        elif spec.get("required"):
+            return None
+    return action
+
+
+def _seed_examples() -> List[Tuple[str, Dict[str, Any]]]:
+    """Fast-path phrases, with sample values in their slots"""
+    samples = {"int": "3", "text": "hello world"}
+    examples = []
+    for phrase, action in builtin_phrases():
+        words = []
+        for word in phrase.split():
+            if word.startswith("{") and word.endswith("}"):
+                word = samples[word[1:-1].split(":")[1]]
+            words.append(word)
+        examples.append((" ".join(words), action))
+    return examples
+
+
+class _Model:
+    __slots__ = ("labels", "idf", "weights", "bias")
+
+    def __init__(self, labels, idf, weights, bias):
+        self.labels = labels
+        self.idf = idf
+        self.weights = weights
+        self.bias = bias
+
+
+class IntentClassifier:
+    """
+    Predict actions locally; ``predict`` returns None when unsure
+
+    ``add_example`` queues a new (command, action) pair and retrains in the
+    background once ``config.intent_classifier_retrain_every`` examples have
+    accumulated. The model is swapped atomically, so prediction never waits
+    for training.
+    """
+
+    def __init__(self):
+        self._threshold = config.intent_classifier_threshold
+        self._examples: Dict[str, Dict[str, Any]] = {}
+        self._pending = 0
+        self._model: Optional[_Model] = None
+        self._lock = threading.Lock()
+        self._training = False
+        self._stats = {"predictions": 0, "accepted": 0, "trainings": 0}
+        for command, action in _seed_examples():
+            self._add(command, action)
+
+    def _add(self, command_text: str, action: Dict[str, Any]) -> bool:
+        key = normalize_command(command_text)
+        if not key or label_of(action) is None:
+            return False
+        self._examples[key] = {k: v for k, v in action.items() if k != "metadata"}
+        return True
+
+    def add_examples(self, examples: List[Tuple[str, Dict[str, Any]]]):
+        """Add training pairs without triggering a retrain"""
+        with self._lock:
+            for command, action in examples:
+                self._add(command, action)
+
+    def add_example(self, command_text: str, action: Dict[str, Any]):
+        """Add a training pair and retrain in the background when enough are new"""
+        with self._lock:
+            if not self._add(command_text, action):
+                return
+            self._pending += 1
+            retrain = self._pending >= config.intent_classifier_retrain_every
+        if retrain:
+            self.train_async()
+
+    def train_async(self):
+        """Retrain on all examples in a background thread"""
+        with self._lock:
+            if self._training:
+                return
+            self._training = True
+            self._pending = 0
+        threading.Thread(target=self._train_worker, daemon=True, name="IntentTrainer").start()
+
+    def _train_worker(self):
+        try:
+            self.train()
+        except Exception as e:
+            logger.error(f"Intent classifier training failed: {e}")
+        finally:
+            with self._lock:
+                self._training = False
+
+    def train(self, examples: Optional[List[Tuple[str, Dict[str, Any]]]] = None):
+        """
+        Fit the model synchronously
+
+        Args:
+            examples: Training pairs; defaults to all collected examples
+        """
+        if examples is None:
+            with self._lock:
+                examples = list(self._examples.items())
+        model = fit(examples)
+        if model is None:
+            return
+        with self._lock:
+            self._model = model
+            self._stats["trainings"] += 1
+        logger.info(
+            f"Intent classifier trained on {len(examples)} examples, {len(model.labels)} labels"
+        )
+
+    def predict(self, command_text: str) -> Optional[Dict[str, Any]]:
+        """
+        Predict the action for a command
+
+        Returns:
+            Action dict with ``metadata.confidence``, or None if the model is
+            not trained, unsure or a required slot is missing
+        """
+        model = self._model
+        if model is None:
+            return None
+        tokens = normalize_command(command_text).split()
+        if not tokens:
+            return None
+
+        label, confidence = predict_label(model, tokens)
+        with self._lock:
+            self._stats["predictions"] += 1
+        if confidence < self._threshold:
+            return None
+        action = fill_slots(label, tokens)
+        if action is None:
+            return None
+        with self._lock:
+            self._stats["accepted"] += 1
+        action["metadata"] = {"source": "classifier", "confidence": round(confidence, 3)}
+        return action
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["examples"] = len(self._examples)
+            stats["labels"] = len(self._model.labels) if self._model else 0
+        return stats
+
+
+def _vectorize(tokens: List[str], idf: np.ndarray) -> np.ndarray:
+    vector = np.zeros(N_FEATURES, dtype=np.float32)
+    for index, count in featurize(tokens).items():
+        vector[index] = (1.0 + np.log(count)) * idf[index]
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def fit(
+    examples: List[Tuple[str, Dict[str, Any]]],
+    epochs: int = 400,
+    lr: float = 8.0,
+    l2: float = 1e-4,
+) -> Optional[_Model]:
+    """Train a softmax regression on hashed TF-IDF features"""
+    pairs = [(normalize_command(c).split(), label_of(a)) for c, a in examples]
+    pairs = [(t, l) for t, l in pairs if t and l]
+    labels = sorted({l for _, l in pairs})
+    if len(labels) < 2:
+        return None
+    label_index = {l: i for i, l in enumerate(labels)}
+
+    doc_freq = np.zeros(N_FEATURES, dtype=np.float32)
+    for tokens, _ in pairs:
+        doc_freq[list(featurize(tokens))] += 1
+    idf = np.log((1 + len(pairs)) / (1 + doc_freq)).astype(np.float32) + 1.0
+
+    x = np.stack([_vectorize(tokens, idf) for tokens, _ in pairs])
+    y = np.array([label_index[l] for _, l in pairs])
+    onehot = np.eye(len(labels), dtype=np.float32)[y]
+    weights = np.zeros((N_FEATURES, len(labels)), dtype=np.float32)
+    bias = np.zeros(len(labels), dtype=np.float32)
+
+    for _ in range(epochs):
+        logits = x @ weights + bias
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+        grad = (probs - onehot) / len(pairs)
+        weights -= lr * (x.T @ grad + l2 * weights)
+        bias -= lr * grad.sum(axis=0)
+
+    return _Model(labels, idf, weights, bias)
+
+
+def predict_label(model: _Model, tokens: List[str]) -> Tuple[str, float]:
+    logits = _vectorize(tokens, model.idf) @ model.weights + model.bias
+    logits -= logits.max()
+    probs = np.exp(logits)
+    probs /= probs.sum()
+    best = int(probs.argmax())
+    return model.labels[best], float(probs[best])
+
+
+def benchmark(examples: List[Tuple[str, Dict[str, Any]]], holdout: float = 0.2, seed: int = 0):
+    """
+    Accuracy, coverage and latency of the classifier on a held-out split
+
+    Accuracy counts a prediction as correct when the filled action equals
+    the expected one (metadata ignored).
+    """
+    examples = [(c, a) for c, a in examples if label_of(a)]
+    random.Random(seed).shuffle(examples)
+    split = int(len(examples) * (1 - holdout))
+    train, test = examples[:split], examples[split:]
+
+    start = time.perf_counter()
+    model = fit(train)
+    train_seconds = time.perf_counter() - start
+    if model is None or not test:
+        print("Not enough labelled examples to benchmark")
+        return
+
+    predictions = []
+    latencies = []
+    for command, expected in test:
+        tokens = normalize_command(command).split()
+        start = time.perf_counter()
+        label, confidence = predict_label(model, tokens)
+        action = fill_slots(label, tokens)
+        latencies.append(time.perf_counter() - start)
+        expected = {k: v for k, v in expected.items() if k != "metadata"}
+        predictions.append((confidence, action == expected))
+
+    latencies.sort()
+    print(
+        f"{len(train)} train / {len(test)} test examples, {len(model.labels)} labels, "
+        f"trained in {train_seconds:.2f}s"
+    )
+    print(
+        f"latency: p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+        f"max {latencies[-1] * 1000:.2f} ms"
+    )
+    for threshold in (0.0, 0.5, 0.7, 0.85, 0.95):
+        accepted = [ok for conf, ok in predictions if conf >= threshold]
+        accuracy = sum(accepted) / len(accepted) if accepted else 0.0
+        print(
+            f"threshold {threshold:.2f}: coverage {len(accepted) / len(test):.0%}, "
+            f"accuracy {accuracy:.0%}"
+        )
+
+
+if __name__ == "__main__":
+    from llm.command_cache import CommandCache
+    from llm.corrections import CorrectionStore
+
+    data = _seed_examples()
+    data += CommandCache().items()
+    data += list(CorrectionStore().items())
+    benchmark(data)
@@ -0,0 +1,207 @@
+"""
+Split compound commands into segments and resolve them piecewise.
+
+"copy this and paste it in notepad" becomes the segments "copy", "open
+notepad" and "paste". Segments the fast path or command cache know are
+resolved locally; only the rest are sent to the LLM, one segment each. The
+results are assembled into a workflow plan for the WorkflowEngine.
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from actions.desktop import APP_ALIASES
+from llm.command_cache import CommandCache
+from llm.fast_path import FastPathResolver
+from llm.normalize import normalize_command
+from llm.schema import is_valid_action
+
+logger = logging.getLogger(__name__)
+
+# Sequencing words, longest first so "and then" wins over "and"
+CONJUNCTIONS = [
+    ("and", "then"),
+    ("after", "that"),
+    ("and",),
+    ("then",),
+    ("also",),
+    ("next",),
+]
+
+# Trailing references to the current selection ("copy this", "paste it")
+_PRONOUNS = {"it", "this", "that", "them", "here"}
+
+# Verbs that start a command even when the fast path has no phrase for them
+_EXTRA_HEADS = {
+    "open", "close", "launch", "start", "switch", "go", "type", "search",
+    "press", "click", "scroll", "take", "show", "hide", "select", "save",
+    "copy", "paste", "cut", "undo", "redo", "mute", "unmute", "turn", "move",
+    "lock", "minimize", "maximize", "restore", "dictate", "find",
+}
+
+_APPS = sorted((a.split() for a in APP_ALIASES), key=len, reverse=True)
+
+# A "search" right after opening one of these searches in the browser
+_BROWSERS = {"chrome.exe", "firefox.exe", "msedge.exe"}
+
+
+def _opens_browser(step: Dict[str, Any]) -> bool:
+    target = str(step.get("target", "")).lower()
+    return step.get("action") == "open_app" and APP_ALIASES.get(target, target) in _BROWSERS
+
+
+class IntentSplitter:
+    """
+    Segment an utterance on conjunctions and resolve each segment
+
+    A conjunction only splits when the following words start a known command
+    ("type salt and pepper" stays one segment). A segment ending in
+    "in <app>" gets an ``open_app`` step for that app in front of it.
+    """
+
+    def __init__(self, fast_path: Optional[FastPathResolver], cache: Optional[CommandCache]):
+        self._fast_path = fast_path
+        self._cache = cache
+        self._heads = set(_EXTRA_HEADS)
+        if fast_path:
+            self._heads |= fast_path.head_words()
+        self._lock = threading.Lock()
+        self._stats = {"compound": 0, "local_segments": 0, "llm_segments": 0, "fallbacks": 0}
+
+    def split(self, command_text: str) -> List[str]:
+        """
+        Split a command into single-intent segments
+
+        Returns:
+            Normalized segments; a single element if the command is not compound
+        """
+        tokens = normalize_command(command_text).split()
+        segments: List[List[str]] = [[]]
+        i = 0
+        while i < len(tokens):
+            for conj in CONJUNCTIONS:
+                end = i + len(conj)
+                if (
+                    tuple(tokens[i:end]) == conj
+                    and end < len(tokens)
+                    and tokens[end] in self._heads
+                    and segments[-1]
+                ):
+                    segments.append([])
+                    i = end
+                    break
+            else:
+                segments[-1].append(tokens[i])
+                i += 1
+
+        result: List[str] = []
+        for words in segments:
+            app = self._target_app(words)
+            if app and len(words) > len(app) + 1:
+                # "paste it in notepad" -> "open notepad", "paste it"
+                result.append("open " + " ".join(app))
+                words = words[: -(len(app) + 1)]
+            result.append(" ".join(words))
+        return [s for s in result if s]
+
+    @staticmethod
+    def _target_app(words: List[str]) -> Optional[List[str]]:
+        for app in _APPS:
+            n = len(app)
+            if len(words) > n and words[-n:] == app and words[-n - 1] in ("in", "into"):
+                return app
+        return None
+
+    def _resolve_locally(self, segment: str) -> Optional[Dict[str, Any]]:
+        words = segment.split()
+        candidates = [segment]
+        while len(words) > 1 and words[-1] in _PRONOUNS:
+            words = words[:-1]
+            candidates.append(" ".join(words))
+        for candidate in candidates:
+            if self._fast_path:
+                result = self._fast_path.resolve(candidate)
+                if result is not None:
+                    return result
+            if self._cache:
+                result = self._cache.get(candidate)
+                if result is not None:
+                    return result
+        return None
+
+    def resolve(
+        self,
+        command_text: str,
+        resolve_with_llm: Callable[[str], Dict[str, Any]],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Resolve a compound command piecewise
+
+        Args:
+            command_text: The voice command text
+            resolve_with_llm: Called for each segment the local layers miss
+
+        Returns:
+            Workflow dict, or None if the command is not compound or a
+            segment could not be resolved (the caller then plans the whole
+            utterance with the LLM)
+        """
+        segments = self.split(command_text)
+        if len(segments) < 2:
+            return None
+        self._count("compound")
+
+        resolved: List[Optional[Dict[str, Any]]] = [self._resolve_locally(s) for s in segments]
+        unresolved = [s for s, r in zip(segments, resolved) if r is None]
+        if len(unresolved) == len(segments):
+            # Nothing to save: one planning call beats one call per segment
+            self._count("fallbacks")
+            return None
+
+        steps: List[Dict[str, Any]] = []
+        for segment, result in zip(segments, resolved):
+            if result is None:
+                result = resolve_with_llm(segment)
+                self._count("llm_segments")
+                if not is_valid_action(result) or result.get("action") == "clarify":
+                    logger.info("Segment '%s' unresolved, planning whole command", segment)
+                    self._count("fallbacks")
+                    return None
+            else:
+                self._count("local_segments")
+            result.pop("metadata", None)
+            steps.extend(result["steps"] if result.get("workflow") else [result])
+
+        steps = self._search_in_browser(steps)
+        logger.info(
+            "Split '%s' into %d steps (%d via LLM)", command_text, len(steps), len(unresolved)
+        )
+        return {
+            "workflow": True,
+            "steps": steps,
+            "metadata": {"source": "splitter", "llm_segments": len(unresolved)},
+        }
+
+    @staticmethod
+    def _search_in_browser(steps: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        "open chrome and search for cats" types the query into the browser
+        instead of running a Start menu search
+        """
+        result: List[Dict[str, Any]] = []
+        for step in steps:
+            if step.get("action") == "search" and result and _opens_browser(result[-1]):
+                result.append({"action": "type_text", "text": step.get("query", "")})
+                result.append({"action": "press_key", "key": "enter"})
+            else:
+                result.append(step)
+        return result
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,231 @@
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from config import config
+from llm.history import ConversationHistory
+from llm.processor import SYSTEM_PROMPT
+from llm.schema import ACTION_SCHEMA, invalid_output_error, validate_action
+
+logger = logging.getLogger(__name__)
+
+try:
+    from llama_cpp import Llama, LlamaGrammar
+
+    _HAS_LLAMA_CPP = True
+except ImportError:
+    Llama = None
+    LlamaGrammar = None
+    _HAS_LLAMA_CPP = False
+
+# Plain completion layout: identical for every command, so the instruction
+# prefix is evaluated once and matched from the context on later calls
+PROMPT_PREFIX = SYSTEM_PROMPT + "\n"
+PROMPT_TEMPLATE = "Command: {command}\nJSON:"
+TURN_TEMPLATE = PROMPT_TEMPLATE + " {response}\n"
+
+
+def _default_threads() -> int:
+    """Generation is memory bound; physical cores beat hyperthreads"""
+    logical = os.cpu_count() or 2
+    return max(1, logical // 2)
+
+
+class LlamaCppProcessor:
+    """In-process GGUF model via llama-cpp-python (no Ollama HTTP hop)"""
+
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        history: Optional[ConversationHistory] = None,
+    ):
+        self._model_path = model_path or config.llama_model_path
+        # A shared history is recorded by its owner (the hybrid processor)
+        self._owns_history = history is None
+        self._history = history if history is not None else ConversationHistory()
+        self._llm = None
+        self._grammar = None
+        self._prefix_tokens: List[int] = []
+        self._prefix_state = None
+        self._lock = threading.Lock()
+        self._available = False
+        self._initialize()
+
+    def _initialize(self):
+        """Load the model and evaluate the instruction prefix once"""
+        if not _HAS_LLAMA_CPP:
+            logger.warning("llama-cpp-python not installed. Local processor unavailable.")
+            return
+        if not self._model_path or not os.path.exists(self._model_path):
+            logger.warning(f"GGUF model not found at {self._model_path}")
+            return
+
+        n_threads = config.llama_n_threads or _default_threads()
+        try:
+            start = time.time()
+            self._llm = Llama(
+                model_path=self._model_path,
+                n_ctx=config.llama_n_ctx,
+                n_threads=n_threads,
+                n_threads_batch=os.cpu_count() or n_threads,
+                n_batch=config.llama_n_batch,
+                verbose=False,
+            )
+            if config.structured_output:
+                self._grammar = LlamaGrammar.from_json_schema(
+                    json.dumps(ACTION_SCHEMA), verbose=False
+                )
+
+            self._prefix_tokens = self._llm.tokenize(PROMPT_PREFIX.encode("utf-8"))
+            self._llm.eval(self._prefix_tokens)
+            self._prefix_state = self._llm.save_state()
+            self._available = True
+            logger.info(
+                f"Local llama.cpp model loaded in {time.time() - start:.2f}s "
+                f"({len(self._prefix_tokens)} prefix tokens, {n_threads} threads)"
+            )
+        except Exception as e:
+            logger.error(f"Failed to load llama.cpp model: {e}")
+            self._llm = None
+            self._available = False
+
+    def is_available(self) -> bool:
+        return self._available
+
+    def _restore_prefix(self):
+        """Reset the context to the cached state right after the prefix"""
+        if self._prefix_state is not None:
+            self._llm.load_state(self._prefix_state)
+
+    def process_command(self, command_text: str, cancel_event=None) -> Dict[str, Any]:
+        """
+        Process a voice command with the in-process model
+
+        Args:
+            command_text: The voice command text
+            cancel_event: Optional threading.Event that aborts generation
+
+        Returns:
+            Action dict, or an error action
+        """
+        if not self._available:
+            return {"action": "error", "message": "Local llama.cpp model not available"}
+
+        # Earlier turns follow the prefix only when the command refers back
+        context = self._history.context(command_text)
+        turns = "".join(
+            TURN_TEMPLATE.format(command=user["content"], response=assistant["content"])
+            for user, assistant in zip(context[::2], context[1::2])
+        )
+        prompt = PROMPT_PREFIX + turns + PROMPT_TEMPLATE.format(command=command_text)
+        with self._lock:
+            try:
+                # Generation reuses the longest token prefix already in the
+                # context, so only the command line is evaluated here
+                pieces = []
+                for chunk in self._llm.create_completion(
+                    prompt,
+                    max_tokens=config.llama_max_tokens,
+                    temperature=0.1,
+                    grammar=self._grammar,
+                    stop=["\n\n", "Command:"],
+                    stream=True,
+                ):
+                    if cancel_event is not None and cancel_event.is_set():
+                        return {"action": "error", "message": "Request cancelled"}
+                    pieces.append(chunk["choices"][0]["text"])
+            except Exception as e:
+                logger.error(f"llama.cpp error: {e}")
+                self._restore_prefix()
+                return {"action": "error", "message": f"Local model error: {e}"}
+
+        raw_response = "".join(pieces).strip()
+        logger.info(f"Local LLM raw response: {raw_response}")
+        result = self._parse_response(raw_response)
+        if self._owns_history:
+            self._history.add(command_text, result)
+        return result
+
+    def _parse_response(self, response_text: str) -> Dict[str, Any]:
+        start = response_text.find("{")
+        end = response_text.rfind("}")
+        try:
+            result = json.loads(response_text[start : end + 1])
+        except (json.JSONDecodeError, ValueError):
+            return invalid_output_error(
+                f"Could not parse local model response: {response_text[:100]}"
+            )
+        problem = validate_action(result)
+        if problem:
+            return invalid_output_error(f"Invalid local model action: {problem}")
+        return result
+
+    def check_connection(self) -> tuple[bool, str]:
+        if not self._available:
+            return False, f"Local model not loaded ({self._model_path})"
+        return True, f"Local llama.cpp model ({os.path.basename(self._model_path)})"
+
+    def clear_history(self):
+        """Forget earlier turns and restore the clean prefix state"""
+        self._history.clear()
+        if self._available:
+            with self._lock:
+                self._restore_prefix()
+
+
+BENCHMARK_COMMANDS = [
+    "open the web browser",
+    "scroll down a bit",
+    "close notepad",
+    "type good morning everyone",
+    "make the volume louder",
+]
+
+
+def benchmark(commands: Optional[List[str]] = None, runs: int = 3) -> Dict[str, Any]:
+    """
+    Compare median command latency of the in-process model against Ollama
+
+    Run with ``python -m llm.llama_cpp_processor`` from the project root.
+    """
+    from llm.processor import LLMProcessor
+
+    commands = commands or BENCHMARK_COMMANDS
+    backends = {"local": LlamaCppProcessor(), "ollama": LLMProcessor()}
+    report = {}
+    for name, processor in backends.items():
+        if name == "local" and not processor.is_available():
+            logger.warning("Skipping local backend: model not available")
+            continue
+        # One untimed call so model loading does not skew the numbers
+        processor.process_command(commands[0])
+        latencies = []
+        errors = 0
+        for _ in range(runs):
+            for command in commands:
+                start = time.perf_counter()
+                result = processor.process_command(command)
+                latencies.append(time.perf_counter() - start)
+                errors += result.get("action") == "error"
+                processor.clear_history()
+        report[name] = {
+            "median_ms": statistics.median(latencies) * 1000,
+            "max_ms": max(latencies) * 1000,
+            "errors": errors,
+            "requests": len(latencies),
+        }
+        print(
+            f"{name:>6}: median {report[name]['median_ms']:.0f} ms, "
+            f"max {report[name]['max_ms']:.0f} ms, "
+            f"{errors}/{len(latencies)} errors"
+        )
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    benchmark()
@@ -0,0 +1,255 @@
+"""
+Macros compiled from successful workflows, replayed without an LLM call.
+
+Every workflow that ran successfully is recorded under its normalized
+command. When two recorded commands differ in a single span of words and
+their plans differ only where that span was copied into a parameter, a
+template with a slot is derived ("open chrome and search for {slot}"), so
+new values of the slot compile straight to steps as well.
+"""
+
+import copy
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import CONFIG_DIR, config
+from llm.normalize import normalize_command
+
+logger = logging.getLogger(__name__)
+
+MACRO_FILE = CONFIG_DIR / "macros.json"
+
+# Placeholder written into template step parameters
+SLOT = "{{slot}}"
+
+
+def _common_affixes(a: List[str], b: List[str]) -> Tuple[int, int]:
+    """Length of the common prefix and (non-overlapping) suffix of two token lists"""
+    prefix = 0
+    while prefix < min(len(a), len(b)) and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while (
+        suffix < min(len(a), len(b)) - prefix
+        and a[len(a) - 1 - suffix] == b[len(b) - 1 - suffix]
+    ):
+        suffix += 1
+    return prefix, suffix
+
+
+def _template_steps(
+    steps_a: List[Dict[str, Any]], span_a: str, steps_b: List[Dict[str, Any]], span_b: str
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Steps with the differing span replaced by SLOT, if the two plans differ
+    only where the span was copied into a string parameter
+    """
+    if len(steps_a) != len(steps_b):
+        return None
+    template = []
+    used_slot = False
+    for step_a, step_b in zip(steps_a, steps_b):
+        if step_a.keys() != step_b.keys() or step_a.get("action") != step_b.get("action"):
+            return None
+        step = {}
+        for param, value_a in step_a.items():
+            value_b = step_b[param]
+            if value_a == value_b:
+                step[param] = copy.deepcopy(value_a)
+                continue
+            if not (isinstance(value_a, str) and isinstance(value_b, str)):
+                return None
+            generic_a = value_a.lower().replace(span_a, SLOT)
+            generic_b = value_b.lower().replace(span_b, SLOT)
+            if SLOT not in generic_a or generic_a != generic_b:
+                return None
+            step[param] = generic_a
+            used_slot = True
+        template.append(step)
+    return template if used_slot else None
+
+
+def _fill(steps: List[Dict[str, Any]], value: str) -> List[Dict[str, Any]]:
+    return [
+        {
+            k: v.replace(SLOT, value) if isinstance(v, str) else copy.deepcopy(v)
+            for k, v in step.items()
+        }
+        for step in steps
+    ]
+
+
+class MacroStore:
+    """
+    Persistent store of recorded workflows and slot templates
+
+    ``match`` returns a workflow for a command that was recorded verbatim or
+    fits a template. A replay that fails is reported through ``invalidate``,
+    which drops the macro or template it came from.
+    """
+
+    def __init__(self, path: Optional[Path] = None, max_size: Optional[int] = None):
+        self._path = Path(path) if path else MACRO_FILE
+        self._max_size = max_size if max_size is not None else config.macro_max_entries
+        self._macros: Dict[str, Dict[str, Any]] = {}
+        self._templates: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._replays = 0
+        self._load()
+
+    def _load(self):
+        if not self._path.exists():
+            return
+        try:
+            with open(self._path, "r") as f:
+                stored = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning("Ignoring unreadable macro store %s: %s", self._path, e)
+            return
+        self._macros = stored.get("macros", {})
+        self._templates = stored.get("templates", {})
+        logger.info(
+            "Loaded %d macros and %d templates", len(self._macros), len(self._templates)
+        )
+
+    def _save(self):
+        tmp_path = self._path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"macros": self._macros, "templates": self._templates}, f)
+            os.replace(tmp_path, self._path)
+        except IOError as e:
+            logger.warning("Failed to persist macros: %s", e)
+
+    def record(self, command_text: str, steps: List[Dict[str, Any]]) -> bool:
+        """
+        Record a workflow that executed successfully
+
+        Args:
+            command_text: The voice command that produced the plan
+            steps: The executed steps
+
+        Returns:
+            True if a new slot template was derived from this recording
+        """
+        key = normalize_command(command_text)
+        if not key or not steps:
+            return False
+        steps = [{k: v for k, v in step.items() if k != "metadata"} for step in steps]
+        tokens = key.split()
+
+        with self._lock:
+            new_template = None
+            for other_key, other in self._macros.items():
+                if other_key == key:
+                    continue
+                template = self._derive(tokens, steps, other_key.split(), other["steps"])
+                if template and template["id"] not in self._templates:
+                    new_template = template
+                    break
+
+            self._macros[key] = {"steps": steps, "created": time.time(), "replays": 0}
+            if len(self._macros) > self._max_size:
+                oldest = min(self._macros, key=lambda k: self._macros[k]["created"])
+                del self._macros[oldest]
+            if new_template:
+                self._templates[new_template["id"]] = new_template
+                logger.info("Compiled macro template '%s'", new_template["id"])
+            self._save()
+        return new_template is not None
+
+    @staticmethod
+    def _derive(
+        tokens_a: List[str],
+        steps_a: List[Dict[str, Any]],
+        tokens_b: List[str],
+        steps_b: List[Dict[str, Any]],
+    ) -> Optional[Dict[str, Any]]:
+        prefix, suffix = _common_affixes(tokens_a, tokens_b)
+        # An anchor is required so a template never matches arbitrary speech
+        if prefix == 0:
+            return None
+        span_a = " ".join(tokens_a[prefix : len(tokens_a) - suffix])
+        span_b = " ".join(tokens_b[prefix : len(tokens_b) - suffix])
+        if not span_a or not span_b:
+            return None
+        steps = _template_steps(steps_a, span_a, steps_b, span_b)
+        if steps is None:
+            return None
+        prefix_tokens = tokens_a[:prefix]
+        suffix_tokens = tokens_a[len(tokens_a) - suffix :] if suffix else []
+        return {
+            "id": " ".join(prefix_tokens + ["{slot}"] + suffix_tokens),
+            "prefix": prefix_tokens,
+            "suffix": suffix_tokens,
+            "steps": steps,
+            "created": time.time(),
+            "replays": 0,
+        }
+
+    def match(self, command_text: str) -> Optional[Dict[str, Any]]:
+        """
+        Compile a command to a workflow from a recorded macro or template
+
+        Returns:
+            Workflow dict, or None if no macro applies
+        """
+        key = normalize_command(command_text)
+        tokens = key.split()
+        with self._lock:
+            macro = self._macros.get(key)
+            if macro is not None:
+                macro["replays"] += 1
+                self._replays += 1
+                steps = copy.deepcopy(macro["steps"])
+                macro_id = key
+            else:
+                best = None
+                for template in self._templates.values():
+                    prefix, suffix = template["prefix"], template["suffix"]
+                    if (
+                        len(tokens) > len(prefix) + len(suffix)
+                        and tokens[: len(prefix)] == prefix
+                        and tokens[len(tokens) - len(suffix) :] == suffix
+                        and (best is None or len(prefix) + len(suffix) > best[0])
+                    ):
+                        best = (len(prefix) + len(suffix), template)
+                if best is None:
+                    return None
+                template = best[1]
+                end = len(tokens) - len(template["suffix"])
+                value = " ".join(tokens[len(template["prefix"]) : end])
+                template["replays"] += 1
+                self._replays += 1
+                steps = _fill(template["steps"], value)
+                macro_id = template["id"]
+
+        logger.info("Macro '%s' compiled '%s' to %d steps", macro_id, command_text, len(steps))
+        return {
+            "workflow": True,
+            "steps": steps,
+            "metadata": {"source": "macro", "macro": macro_id},
+        }
+
+    def invalidate(self, macro_id: str) -> bool:
+        """Drop a macro or template, e.g. after its replay failed"""
+        with self._lock:
+            removed = self._macros.pop(macro_id, None) or self._templates.pop(macro_id, None)
+            if removed is None:
+                return False
+            self._save()
+        logger.info("Invalidated macro '%s'", macro_id)
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "macros": len(self._macros),
+                "templates": len(self._templates),
+                "replays": self._replays,
+            }
@@ -0,0 +1,102 @@
+"""
+Text normalization shared by the local command resolution layers.
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+from config import config
+
+NUMBER_WORDS = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11,
+    "twelve": 12, "thirteen": 13, "fourteen": 14, "fifteen": 15,
+    "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19,
+    "twenty": 20,
+}
+
+# Disfluencies are dropped anywhere, politeness only at the edges
+_DISFLUENCIES = {"um", "uh", "er", "erm", "hmm", "uhm", "ah"}
+_LEADING_FILLERS = ("please", "can you", "could you", "would you", "now", "okay", "ok")
+_TRAILING_FILLERS = ("please", "now", "for me")
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+", re.I)
+
+
+def _spans(text: str) -> List[Tuple[str, int]]:
+    """Lowercased tokens with their start offsets in the original text"""
+    return [(m.group().lower(), m.start()) for m in _TOKEN_RE.finditer(text)]
+
+
+def _strip_fillers(spans: List[Tuple[str, int]]) -> List[Tuple[str, int]]:
+    spans = [s for s in spans if s[0] not in _DISFLUENCIES]
+    changed = True
+    while changed and spans:
+        changed = False
+        for filler in _LEADING_FILLERS:
+            words = filler.split()
+            if [t for t, _ in spans[: len(words)]] == words and len(spans) > len(words):
+                spans = spans[len(words):]
+                changed = True
+        for filler in _TRAILING_FILLERS:
+            words = filler.split()
+            if [t for t, _ in spans[-len(words):]] == words and len(spans) > len(words):
+                spans = spans[: -len(words)]
+                changed = True
+    return spans
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, strip punctuation and surrounding politeness fillers."""
+    return [token for token, _ in _strip_fillers(_spans(text))]
+
+
+def command_spans(text: str) -> List[Tuple[str, int]]:
+    """
+    Tokens of normalize_command(text) with their offsets in text
+
+    Lets callers match on the canonical tokens but take a value (e.g. the
+    text to type) from the command as it was spoken.
+    """
+    spans = _spans(text)
+    wake = _TOKEN_RE.findall(config.wake_word.lower())
+    if wake and [t for t, _ in spans[: len(wake)]] == wake:
+        spans = spans[len(wake):]
+    return _strip_fillers(spans)
+
+
+def normalize_command(text: str) -> str:
+    """
+    Canonical form of a command used as a lookup key
+
+    Strips a leading wake word, fillers, punctuation, case and extra whitespace
+    so "Hey assistant, um, open Chrome please" and "open chrome" share a key.
+    """
+    return " ".join(token for token, _ in command_spans(text))
+
+
+def parse_number(token: str) -> Optional[int]:
+    if token.isdigit():
+        return int(token)
+    return NUMBER_WORDS.get(token)
+
+
+def text_distance(a: str, b: str) -> float:
+    """
+    Character edit distance between two strings, scaled to 0..1
+
+    0 means identical, 1 means nothing in common (relative to the longer one).
+    """
+    if a == b:
+        return 0.0
+    if not a or not b:
+        return 1.0
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            )
+        previous = current
+    return previous[-1] / max(len(a), len(b))
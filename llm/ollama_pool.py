@@ -0,0 +1,173 @@
+"""
+Pool of Ollama hosts with least-outstanding load balancing and failover.
+"""
+
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Union
+
+from config import config
+from llm.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+
+def parse_hosts(value: Union[str, List[str]]) -> List[str]:
+    """
+    Normalize ``ollama_url`` into a list of base URLs
+
+    Accepts a single URL, a comma separated string or a list.
+    """
+    if isinstance(value, str):
+        value = value.split(",")
+    hosts = [v.strip().rstrip("/") for v in value if v and v.strip()]
+    return list(dict.fromkeys(hosts))
+
+
+class OllamaHost:
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.healthy = True
+        self.resident = False
+        self.last_check = 0.0
+
+
+class OllamaHostPool:
+    """
+    Pick the Ollama host for each request
+
+    Healthy hosts that already have the model loaded are preferred, then the
+    host with the fewest outstanding requests. Ties go to the host this
+    assistant used last (its KV cache holds our conversation), then to a
+    per-process random order so several assistants spread over the hosts
+    instead of all starting on the first one. A host that fails a request is
+    taken out of rotation until the background health check sees it answer.
+    """
+
+    def __init__(self, urls: List[str], model: Optional[str] = None):
+        if not urls:
+            raise ValueError("Ollama host pool needs at least one URL")
+        self._model = model or config.ollama_model
+        self._hosts = {url: OllamaHost(url) for url in urls}
+        self._rank = {url: random.random() for url in urls}
+        self._last_url = None
+        self._http = get_http_client()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def urls(self) -> List[str]:
+        return list(self._hosts)
+
+    def acquire(self, exclude: Optional[List[str]] = None) -> Optional[str]:
+        """
+        Reserve the best host for one request; pair with :meth:`release`
+
+        Args:
+            exclude: Hosts already tried for this request
+
+        Returns:
+            Base URL of the chosen host, or None if every host is excluded
+        """
+        exclude = exclude or []
+        with self._lock:
+            candidates = [h for h in self._hosts.values() if h.url not in exclude]
+            if not candidates:
+                return None
+            # Unhealthy hosts are a last resort rather than never tried, so a
+            # pool whose health checks are stale still attempts something
+            best = min(
+                candidates,
+                key=lambda h: (
+                    not h.healthy,
+                    not h.resident,
+                    h.outstanding,
+                    h.url != self._last_url,
+                    self._rank[h.url],
+                ),
+            )
+            best.outstanding += 1
+            best.requests += 1
+            self._last_url = best.url
+            return best.url
+
+    def release(self, url: str, success: bool = True):
+        """Return a host reserved by :meth:`acquire`"""
+        with self._lock:
+            host = self._hosts.get(url)
+            if host is None:
+                return
+            host.outstanding = max(0, host.outstanding - 1)
+            if success:
+                host.healthy = True
+                # A successful generation leaves the model loaded on that host
+                host.resident = True
+            else:
+                host.failures += 1
+                host.healthy = False
+                logger.warning(f"Ollama host {url} failed, removed from rotation")
+
+    def check_host(self, url: str) -> bool:
+        """Refresh health and model residency of one host via /api/ps"""
+        try:
+            resp = self._http.get(f"{url}/api/ps", read_timeout=5)
+            resp.raise_for_status()
+            models = resp.json().get("models", [])
+            healthy = True
+            resident = any(self._model in m.get("name", "") for m in models)
+        except Exception as e:
+            logger.debug(f"Health check for {url} failed: {e}")
+            healthy = False
+            resident = False
+
+        with self._lock:
+            host = self._hosts[url]
+            if healthy and not host.healthy:
+                logger.info(f"Ollama host {url} is back in rotation")
+            host.healthy = healthy
+            host.resident = resident
+            host.last_check = time.time()
+        return healthy
+
+    def refresh(self):
+        for url in self.urls:
+            self.check_host(url)
+
+    def _health_loop(self):
+        while not self._stop_event.wait(timeout=config.ollama_health_interval):
+            self.refresh()
+
+    def start(self):
+        """Run health checks in the background (only useful with several hosts)"""
+        if self._thread or len(self._hosts) < 2:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._health_loop, daemon=True, name="OllamaHealth"
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                host.url: {
+                    "healthy": host.healthy,
+                    "resident": host.resident,
+                    "outstanding": host.outstanding,
+                    "requests": host.requests,
+                    "failures": host.failures,
+                }
+                for host in self._hosts.values()
+            }
@@ -0,0 +1,74 @@
+"""
+Prompt evaluation (prefill) and output token statistics reported by Ollama.
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+
+class PrefillStats:
+    """
+    Track ``prompt_eval_count``/``prompt_eval_duration`` per request
+
+    The first sample after the prefix was (re)built is the cold baseline: the
+    full system prompt had to be evaluated. Later samples should only cover
+    the new user turn when the prefix is reused from Ollama's KV cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cold: Optional[Dict[str, float]] = None
+        self._warm_count = 0
+        self._warm_tokens = 0
+        self._warm_ns = 0
+        self._warm_output_tokens = 0
+        self._last: Optional[Dict[str, float]] = None
+        self._expect_cold = True
+        self._aborted = 0
+
+    def mark_cold(self):
+        """The next sample re-evaluates the whole prefix (model reload, reset)"""
+        with self._lock:
+            self._expect_cold = True
+
+    def record(self, response: Dict[str, Any]):
+        """Record the timing fields of a final (done) Ollama response chunk"""
+        if "prompt_eval_count" not in response:
+            return
+        sample = {
+            "prompt_eval_count": response.get("prompt_eval_count", 0),
+            "prompt_eval_ms": response.get("prompt_eval_duration", 0) / 1e6,
+            "eval_count": response.get("eval_count", 0),
+        }
+        with self._lock:
+            self._last = sample
+            if self._expect_cold:
+                self._cold = sample
+                self._expect_cold = False
+            else:
+                self._warm_count += 1
+                self._warm_tokens += sample["prompt_eval_count"]
+                self._warm_ns += response.get("prompt_eval_duration", 0)
+                self._warm_output_tokens += sample["eval_count"]
+
+    def record_aborted(self):
+        """A request whose stream was closed before Ollama sent its stats"""
+        with self._lock:
+            self._aborted += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            warm = None
+            if self._warm_count:
+                warm = {
+                    "samples": self._warm_count,
+                    "avg_prompt_eval_count": self._warm_tokens / self._warm_count,
+                    "avg_prompt_eval_ms": self._warm_ns / self._warm_count / 1e6,
+                    "avg_eval_count": self._warm_output_tokens / self._warm_count,
+                }
+            return {
+                "cold": self._cold,
+                "warm": warm,
+                "last": self._last,
+                "aborted_without_stats": self._aborted,
+            }
@@ -1,7 +1,16 @@
 import json
 import logging
+import math
+import threading
 import requests
 from config import config
+from llm.history import ConversationHistory
+from llm.http_client import get_http_client
+from llm.ollama_pool import OllamaHostPool, parse_hosts
+from llm.prefill import PrefillStats
+from llm.schema import ACTION_SCHEMA, invalid_output_error, validate_action
+from llm.streaming import IncrementalJSONParser
+from llm.warmth import ModelWarmthManager
 
 logger = logging.getLogger(__name__)
 
@@ -61,54 +70,248 @@ Common mappings:
 """
 
 
+# Acknowledgement turn that closes the instruction preamble in stable-prefix mode
+PREFIX_ACK = '{"action": "help"}'
+
+
 class LLMProcessor:
-    def __init__(self):
-        self._url = config.ollama_url
-        self._model = config.ollama_model
-        self._conversation = []
+    def __init__(self, url=None, model=None, logprobs=False, history=None):
+        self._model = model or config.ollama_model
+        self._stream = config.ollama_stream
+        # Ask Ollama for token logprobs and report a confidence with each result
+        self._logprobs = logprobs
+        self._http = get_http_client()
+        self._prefill = PrefillStats()
+        # ollama_url may name several hosts; each request goes to one of them
+        self._pool = OllamaHostPool(parse_hosts(url or config.ollama_url), self._model)
+        self._warmth = {
+            host: ModelWarmthManager(
+                host, self._model, on_warm=lambda host=host: self.prime_prefix(host)
+            )
+            for host in self._pool.urls
+        }
+        self._keep_alive = config.ollama_keep_alive
+        # Options must stay identical between calls or Ollama drops its KV cache
+        self._options = {
+            "temperature": 0.1,
+            "num_predict": 256,
+        }
+        # A shared history is recorded by its owner (the hybrid processor)
+        self._owns_history = history is None
+        self._history = history if history is not None else ConversationHistory()
 
-    def _call_ollama(self, messages):
+    def _prefix_messages(self):
+        """
+        Messages every request starts with
+
+        In stable-prefix mode the instructions are sent as the first user turn
+        instead of a system message: some chat templates (e.g. Mistral) render
+        the system prompt next to the latest user message, which changes the
+        token prefix on every call and defeats Ollama's prompt cache.
+        """
+        if config.ollama_stable_prefix:
+            return [
+                {"role": "user", "content": SYSTEM_PROMPT},
+                {"role": "assistant", "content": PREFIX_ACK},
+            ]
+        return [{"role": "system", "content": SYSTEM_PROMPT}]
+
+    def _call_ollama(self, messages, cancel_event=None, token_logprobs=None):
         payload = {
             "model": self._model,
             "messages": messages,
+            "stream": self._stream,
+            "keep_alive": self._keep_alive,
+            "options": self._options,
+        }
+        if config.structured_output:
+            # Constrain decoding to the action schema
+            payload["format"] = ACTION_SCHEMA
+        if token_logprobs is not None:
+            payload["logprobs"] = True
+
+        # Fail over to the next host until every host in the pool was tried
+        tried = []
+        error = None
+        while True:
+            host = self._pool.acquire(exclude=tried)
+            if host is None:
+                break
+            tried.append(host)
+            try:
+                if self._stream:
+                    content = self._call_ollama_stream(
+                        host, payload, cancel_event, token_logprobs
+                    )
+                else:
+                    resp = self._http.post(f"{host}/api/chat", json=payload)
+                    resp.raise_for_status()
+                    data = resp.json()
+                    self._prefill.record(data)
+                    if token_logprobs is not None:
+                        token_logprobs.extend(data.get("logprobs") or [])
+                    content = data["message"]["content"]
+            except Exception as e:
+                self._pool.release(host, success=False)
+                if token_logprobs is not None:
+                    token_logprobs.clear()
+                logger.warning("Ollama request to %s failed: %s", host, e)
+                error = e
+                continue
+            self._pool.release(host)
+            self._warmth[host].note_activity()
+            return content
+
+        if isinstance(error, requests.ConnectionError):
+            logger.error("Cannot connect to Ollama at %s", ", ".join(tried))
+            return json.dumps({"action": "error", "message": "Cannot connect to Ollama. Is it running?"})
+        logger.error("Ollama error: %s", error)
+        return json.dumps({"action": "error", "message": str(error)})
+
+    def _call_ollama_stream(self, host, payload, cancel_event=None, token_logprobs=None):
+        """
+        Read Ollama's NDJSON chunks and return as soon as the first JSON
+        object closes. Token logprobs of the chunks read so far are appended
+        to token_logprobs if given.
+
+        With structured output the schema ends generation right after the
+        object, so the rest of the stream (the final stats chunk) is read on
+        a background thread: the stats are kept and the fully read response
+        returns its connection to the keep-alive pool. Without it the model
+        may keep talking, so the response is closed to abort generation;
+        that connection cannot be reused. cancel_event also aborts.
+        """
+        resp = self._http.post(f"{host}/api/chat", json=payload, stream=True)
+        finishing = False
+        try:
+            resp.raise_for_status()
+            parser = IncrementalJSONParser()
+            pieces = []
+            lines = resp.iter_lines()
+            for line in lines:
+                if cancel_event is not None and cancel_event.is_set():
+                    self._prefill.record_aborted()
+                    return json.dumps({"action": "error", "message": "Request cancelled"})
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(chunk["error"])
+                if chunk.get("done"):
+                    self._prefill.record(chunk)
+                if token_logprobs is not None:
+                    token_logprobs.extend(chunk.get("logprobs") or [])
+                piece = chunk.get("message", {}).get("content", "")
+                pieces.append(piece)
+                obj = parser.feed(piece)
+                if chunk.get("done"):
+                    # Reading to the end releases the connection back to the pool
+                    for _ in lines:
+                        pass
+                    return obj if obj is not None else "".join(pieces)
+                if obj is not None:
+                    if config.structured_output:
+                        finishing = True
+                        threading.Thread(
+                            target=self._finish_stream, args=(resp, lines), daemon=True
+                        ).start()
+                    else:
+                        logger.debug(
+                            "Early dispatch after %d chars, aborting generation",
+                            parser.chars_seen,
+                        )
+                        self._prefill.record_aborted()
+                    return obj
+            return "".join(pieces)
+        finally:
+            if not finishing:
+                resp.close()
+
+    def _finish_stream(self, resp, lines):
+        """Read the tail of an early-dispatched stream for its final stats"""
+        try:
+            for line in lines:
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("done"):
+                    self._prefill.record(chunk)
+        except Exception as e:
+            logger.debug("Reading the end of the Ollama stream failed: %s", e)
+        finally:
+            resp.close()
+
+    def prime_prefix(self, host=None):
+        """
+        Evaluate the instruction prefix once so later commands reuse it from
+        Ollama's KV cache and only pay for their own turn
+
+        Args:
+            host: Pool host to prime; all hosts when omitted
+        """
+        if host is None:
+            for url in self._pool.urls:
+                self.prime_prefix(url)
+            return
+        self._prefill.mark_cold()
+        payload = {
+            "model": self._model,
+            "messages": [*self._prefix_messages(), {"role": "user", "content": "help"}],
             "stream": False,
-            "options": {
-                "temperature": 0.1,
-                "num_predict": 256,
-            },
+            "keep_alive": self._keep_alive,
+            # The same options as real requests, or the KV prefix is not reused
+            "options": self._options,
         }
+        if config.structured_output:
+            payload["format"] = ACTION_SCHEMA
         try:
-            resp = requests.post(
-                f"{self._url}/api/chat",
-                json=payload,
-                timeout=30,
+            resp = self._http.post(
+                f"{host}/api/chat", json=payload, read_timeout=config.ollama_load_timeout
             )
             resp.raise_for_status()
-            return resp.json()["message"]["content"]
-        except requests.ConnectionError:
-            logger.error("Cannot connect to Ollama at %s", self._url)
-            return json.dumps({"action": "error", "message": "Cannot connect to Ollama. Is it running?"})
+            self._prefill.record(resp.json())
+            logger.info(
+                "Primed Ollama prompt prefix on %s: %s", host, self._prefill.get_stats()["cold"]
+            )
         except Exception as e:
-            logger.error("Ollama error: %s", e)
-            return json.dumps({"action": "error", "message": str(e)})
+            logger.warning("Failed to prime Ollama prompt prefix on %s: %s", host, e)
 
-    def process_command(self, command_text):
+    def process_command(self, command_text, cancel_event=None):
+        # Context is only sent with commands that refer back, so most
+        # requests are the cached prefix plus the command alone
         messages = [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            *self._conversation[-6:],
+            *self._prefix_messages(),
+            *self._history.context(command_text),
             {"role": "user", "content": command_text},
         ]
 
-        raw_response = self._call_ollama(messages)
+        token_logprobs = [] if self._logprobs else None
+        raw_response = self._call_ollama(messages, cancel_event, token_logprobs)
+        if cancel_event is not None and cancel_event.is_set():
+            return {"action": "error", "message": "Request cancelled"}
         logger.info("LLM raw response: %s", raw_response)
 
-        self._conversation.append({"role": "user", "content": command_text})
-        self._conversation.append({"role": "assistant", "content": raw_response})
+        result = self._parse_response(raw_response)
+        if self._owns_history:
+            self._history.add(command_text, result)
+        if token_logprobs:
+            result.setdefault("metadata", {})
+            result["metadata"]["confidence"] = self._confidence(token_logprobs)
+        return result
 
-        if len(self._conversation) > 20:
-            self._conversation = self._conversation[-12:]
+    @staticmethod
+    def _confidence(token_logprobs):
+        """
+        Probability of the least likely generated token
 
-        return self._parse_response(raw_response)
+        With schema-constrained decoding the structural tokens are nearly
+        forced, so the minimum reflects the most uncertain real choice
+        (action name or parameter value).
+        """
+        logprobs = [t["logprob"] for t in token_logprobs if "logprob" in t]
+        if not logprobs:
+            return None
+        return round(math.exp(min(logprobs)), 3)
 
     def _parse_response(self, response_text):
         text = response_text.strip()
@@ -117,35 +320,75 @@ class LLMProcessor:
             lines = [l for l in lines if not l.startswith("```")]
             text = "\n".join(lines).strip()
 
+        result = None
         try:
             result = json.loads(text)
-            if isinstance(result, dict) and "action" in result:
-                return result
         except json.JSONDecodeError:
-            pass
+            # Unconstrained output may wrap the object in chatter
+            start = text.find("{")
+            end = text.rfind("}")
+            if start != -1 and end != -1:
+                try:
+                    result = json.loads(text[start : end + 1])
+                except json.JSONDecodeError:
+                    pass
 
-        start = text.find("{")
-        end = text.rfind("}")
-        if start != -1 and end != -1:
-            try:
-                result = json.loads(text[start : end + 1])
-                if isinstance(result, dict) and "action" in result:
-                    return result
-            except json.JSONDecodeError:
-                pass
+        if result is None:
+            return invalid_output_error(f"Could not parse LLM response: {text[:100]}")
 
-        return {"action": "error", "message": f"Could not parse LLM response: {text[:100]}"}
+        problem = validate_action(result)
+        if problem:
+            return invalid_output_error(f"Invalid LLM action: {problem}")
+        return result
 
     def check_connection(self):
-        try:
-            resp = requests.get(f"{self._url}/api/tags", timeout=5)
-            resp.raise_for_status()
-            models = resp.json().get("models", [])
-            model_names = [m.get("name", "") for m in models]
-            has_model = any(self._model in n for n in model_names)
-            return True, has_model, model_names
-        except Exception as e:
-            return False, False, []
+        """Connected if any pool host answers; models are merged across hosts"""
+        connected = False
+        model_names = []
+        for host in self._pool.urls:
+            try:
+                resp = self._http.get(f"{host}/api/tags", read_timeout=5)
+                resp.raise_for_status()
+            except Exception:
+                continue
+            connected = True
+            for m in resp.json().get("models", []):
+                name = m.get("name", "")
+                if name not in model_names:
+                    model_names.append(name)
+        has_model = any(self._model in n for n in model_names)
+        return connected, has_model, model_names
+
+    def warm_up(self):
+        """Open the connections and start keeping the model resident on each host"""
+        connected = False
+        for host in self._pool.urls:
+            if self._http.warmup(host):
+                connected = True
+                self._warmth[host].start()
+        self._pool.refresh()
+        self._pool.start()
+        return connected
+
+    def get_prefill_stats(self):
+        return self._prefill.get_stats()
+
+    def get_warmth_status(self):
+        """Residency of the model; "state" is the best state over all hosts"""
+        hosts = {host: w.get_status() for host, w in self._warmth.items()}
+        order = ["warm", "loading", "cold", "unknown", "error"]
+        status = dict(min(hosts.values(), key=lambda s: order.index(s["state"])))
+        if len(hosts) > 1:
+            status["hosts"] = hosts
+        return status
+
+    def get_pool_stats(self):
+        return self._pool.get_stats()
+
+    def shutdown(self):
+        self._pool.stop()
+        for warmth in self._warmth.values():
+            warmth.stop()
 
     def clear_history(self):
-        self._conversation.clear()
+        self._history.clear()
@@ -0,0 +1,153 @@
+"""
+Token-bucket rate limiting for quota-limited API backends (Gemini).
+
+Two buckets track the requests-per-minute and tokens-per-minute budgets.
+Requests reserve capacity in arrival order: a request that would have to
+wait longer than its deadline is refused up front instead of being sent
+and failing with a quota error after a round trip.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Bucket of ``capacity`` units refilled at ``rate`` units per second
+
+    The level may go negative: a reservation made while the bucket is short
+    is paid back by the refill, which is what orders queued requests.
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.level = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` units are available"""
+        self._refill(now)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def reserve(self, amount: float, now: float):
+        self._refill(now)
+        self.level -= amount
+
+    def drain(self, now: float, seconds: float = 0.0):
+        """Empty the bucket, plus ``seconds`` worth of refill"""
+        self._refill(now)
+        self.level = min(self.level, -seconds * self.rate)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limiter with a deadline queue
+
+    ``acquire`` blocks the caller until its reservation is due, or returns
+    False at once if that would take longer than ``timeout``. Token costs
+    are estimated before the call and corrected with ``record_usage`` once
+    the real count is known.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self._lock = threading.Lock()
+        self._requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self._tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self._rpm = requests_per_minute
+        self._tpm = tokens_per_minute
+        # (time, requests, tokens) sent in the last minute, for utilization
+        self._recent = deque()
+        self._stats = {
+            "admitted": 0,
+            "queued": 0,
+            "rejected": 0,
+            "quota_errors": 0,
+            "queue_wait": 0.0,
+        }
+
+    def acquire(self, tokens: int, timeout: float) -> bool:
+        """
+        Reserve one request and ``tokens`` tokens
+
+        Args:
+            tokens: Estimated tokens of the request (prompt and output)
+            timeout: Longest acceptable wait in seconds
+
+        Returns:
+            True once the request may be sent, False if it would wait too long
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self._requests.wait_time(1, now), self._tokens.wait_time(tokens, now))
+            if wait > timeout:
+                self._stats["rejected"] += 1
+                return False
+            self._requests.reserve(1, now)
+            self._tokens.reserve(tokens, now)
+            self._prune(now)
+            self._recent.append((now + wait, 1, tokens))
+            self._stats["admitted"] += 1
+            if wait > 0:
+                self._stats["queued"] += 1
+                self._stats["queue_wait"] += wait
+        if wait > 0:
+            logger.debug("Rate limiter: queued request for %.2fs", wait)
+            time.sleep(wait)
+        return True
+
+    def record_usage(self, estimated: int, actual: int):
+        """Correct the token bucket once a request's real token count is known"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens.reserve(actual - estimated, now)
+            self._recent.append((now, 0, actual - estimated))
+
+    def on_quota_error(self, backoff: float = 0.0):
+        """
+        The server refused a request for quota: empty both buckets
+
+        Requests are then refused (and routed elsewhere) until the buckets
+        have refilled for ``backoff`` seconds.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._requests.drain(now, backoff)
+            self._tokens.drain(now, backoff)
+            self._stats["quota_errors"] += 1
+        logger.warning("Quota exceeded, holding requests for %.0fs", backoff)
+
+    def _prune(self, now: float):
+        while self._recent and self._recent[0][0] < now - 60:
+            self._recent.popleft()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._prune(time.monotonic())
+            stats = dict(self._stats)
+            queue_wait = stats.pop("queue_wait")
+            stats.update(
+                {
+                    "rpm_limit": self._rpm,
+                    "tpm_limit": self._tpm,
+                    "rpm_utilization": sum(r for _, r, _ in self._recent) / self._rpm,
+                    "tpm_utilization": sum(t for _, _, t in self._recent) / self._tpm,
+                    "requests_available": max(0.0, self._requests.level),
+                    "tokens_available": max(0.0, self._tokens.level),
+                    "avg_queue_wait_ms": (
+                        queue_wait / stats["queued"] * 1000 if stats["queued"] else 0.0
+                    ),
+                }
+            )
+        return stats
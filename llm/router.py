@@ -0,0 +1,255 @@
+"""
+Latency-aware backend routing with per-backend circuit breakers.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker
+
+    - "closed": requests flow normally
+    - "open": the backend is skipped after ``failure_threshold`` consecutive
+      failures
+    - "half_open": ``reset_timeout`` has elapsed and a background probe is
+      checking whether the backend recovered
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.state = "closed"
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == "half_open" or (
+            self.state == "closed"
+            and self.consecutive_failures >= self._failure_threshold
+        ):
+            self.state = "open"
+            self.opened_at = time.time()
+            self.times_opened += 1
+
+    def allows_traffic(self) -> bool:
+        return self.state == "closed"
+
+    def due_for_probe(self) -> bool:
+        return self.state == "open" and time.time() - self.opened_at >= self._reset_timeout
+
+
+class BackendStats:
+    """EWMA and windowed p95 latency plus error rate for one backend"""
+
+    def __init__(self, alpha: float, window: int):
+        self._alpha = alpha
+        self.ewma: Optional[float] = None
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.requests = 0
+        self.invalid_outputs = 0
+        self.last_request = time.time()
+
+    def record(self, latency: float, success: bool):
+        self.requests += 1
+        self.last_request = time.time()
+        self.outcomes.append(success)
+        if success:
+            self.latencies.append(latency)
+            if self.ewma is None:
+                self.ewma = latency
+            else:
+                self.ewma = self._alpha * latency + (1 - self._alpha) * self.ewma
+
+    def record_invalid(self):
+        self.requests += 1
+        self.last_request = time.time()
+        self.invalid_outputs += 1
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    @property
+    def p95(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+
+class AdaptiveRouter:
+    """
+    Order backends by expected latency and skip the ones whose breaker is open
+
+    The expected latency of a backend is its EWMA divided by its success rate,
+    i.e. the expected time until a successful answer when failed attempts are
+    retried elsewhere. Backends without samples use ``router_prior_latency``
+    and keep their registration order as a tie-break. A backend whose last
+    request is ``router_explore_interval`` seconds older than the last
+    request of the backend actually serving is tried first once, so a
+    backend that recovered is not starved by stale statistics. A pause in
+    which no backend is used does not count: after it the fastest backend
+    still goes first.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._order: List[str] = []
+        self._probes: Dict[str, Callable[[], bool]] = {}
+        self._stats: Dict[str, BackendStats] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._running = False
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def register(self, name: str, probe: Callable[[], bool]):
+        """
+        Add a backend
+
+        Args:
+            name: Backend name ("gemini", "ollama", ...)
+            probe: Cheap health check used while the breaker is half-open
+        """
+        with self._lock:
+            if name not in self._order:
+                self._order.append(name)
+            self._probes[name] = probe
+            self._stats[name] = BackendStats(
+                config.router_ewma_alpha, config.router_window
+            )
+            self._breakers[name] = CircuitBreaker(
+                config.router_failure_threshold, config.router_reset_timeout
+            )
+
+    def unregister(self, name: str):
+        with self._lock:
+            if name in self._order:
+                self._order.remove(name)
+            self._probes.pop(name, None)
+            self._stats.pop(name, None)
+            self._breakers.pop(name, None)
+
+    def record(self, name: str, latency: float, success: bool):
+        """Feed the outcome of a request into the backend's stats and breaker"""
+        with self._lock:
+            if name not in self._stats:
+                return
+            self._stats[name].record(latency, success)
+            breaker = self._breakers[name]
+            was_open = breaker.state
+            if success:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+            if breaker.state != was_open:
+                logger.warning(f"Circuit for {name}: {was_open} -> {breaker.state}")
+
+    def record_invalid(self, name: str):
+        """
+        Count an answer that arrived but could not be parsed or validated
+
+        The backend is reachable, so this feeds neither its error rate nor
+        its circuit breaker.
+        """
+        with self._lock:
+            if name in self._stats:
+                self._stats[name].record_invalid()
+
+    def _expected_latency(self, name: str) -> float:
+        stats = self._stats[name]
+        ewma = stats.ewma if stats.ewma is not None else config.router_prior_latency
+        return ewma / max(0.05, 1 - stats.error_rate)
+
+    def candidates(self) -> List[str]:
+        """Backends with a closed breaker, best expected latency first"""
+        with self._lock:
+            open_order = [n for n in self._order if self._breakers[n].allows_traffic()]
+            ranked = sorted(
+                open_order,
+                key=lambda n: (self._expected_latency(n), self._order.index(n)),
+            )
+            if not ranked:
+                return ranked
+            serving = self._stats[ranked[0]].last_request
+            for name in ranked[1:]:
+                if serving - self._stats[name].last_request >= config.router_explore_interval:
+                    ranked.remove(name)
+                    ranked.insert(0, name)
+                    break
+            return ranked
+
+    def _probe_loop(self):
+        while not self._stop_event.wait(timeout=config.router_probe_interval):
+            with self._lock:
+                due = [n for n in self._order if self._breakers[n].due_for_probe()]
+                for name in due:
+                    self._breakers[name].state = "half_open"
+            for name in due:
+                try:
+                    healthy = bool(self._probes[name]())
+                except Exception as e:
+                    logger.debug(f"Probe for {name} raised {e}")
+                    healthy = False
+                logger.info(f"Half-open probe for {name}: {'ok' if healthy else 'failed'}")
+                with self._lock:
+                    if name not in self._breakers:
+                        continue
+                    if healthy:
+                        self._breakers[name].record_success()
+                    else:
+                        self._breakers[name].record_failure()
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._probe_loop, daemon=True, name="RouterProbe"
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Live per-backend latency, error rate and breaker state"""
+        with self._lock:
+            stats = {}
+            for name in self._order:
+                backend = self._stats[name]
+                breaker = self._breakers[name]
+                stats[name] = {
+                    "requests": backend.requests,
+                    "ewma_latency": backend.ewma,
+                    "p95_latency": backend.p95,
+                    "error_rate": backend.error_rate,
+                    "invalid_outputs": backend.invalid_outputs,
+                    "expected_latency": self._expected_latency(name),
+                    "circuit": breaker.state,
+                    "consecutive_failures": breaker.consecutive_failures,
+                    "times_opened": breaker.times_opened,
+                }
+            return stats
@@ -0,0 +1,175 @@
+"""
+Action JSON schema derived from the action catalog, plus a precompiled validator.
+
+The schemas constrain generation (Ollama ``format``, Gemini
+``response_schema``) and the validator checks every parsed result, so a
+malformed answer is caught without another round trip.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from llm.catalog import ACTION_CATALOG
+
+# Actions the model must never produce itself
+_INTERNAL_ACTIONS = {"error"}
+
+_JSON_TYPES = {"string": (str,), "integer": (int,), "array": (list,)}
+
+
+def _param_schema(spec: Dict[str, Any]) -> Dict[str, Any]:
+    schema: Dict[str, Any] = {"type": spec["type"]}
+    if spec["type"] == "array":
+        schema["items"] = {"type": "string"}
+    if "enum" in spec:
+        schema["enum"] = list(spec["enum"])
+    return schema
+
+
+def _action_schema(name: str, params: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    properties = {"action": {"type": "string", "enum": [name]}}
+    properties.update({p: _param_schema(spec) for p, spec in params.items()})
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": ["action"] + [p for p, spec in params.items() if spec.get("required")],
+    }
+
+
+def build_action_schema(workflows: bool = False) -> Dict[str, Any]:
+    """
+    JSON schema accepting exactly one catalog action
+
+    Args:
+        workflows: Also accept ``{"workflow": true, "steps": [...]}`` plans
+    """
+    actions = [
+        _action_schema(name, params)
+        for name, params in ACTION_CATALOG.items()
+        if name not in _INTERNAL_ACTIONS
+    ]
+    if not workflows:
+        return {"anyOf": actions}
+
+    workflow = {
+        "type": "object",
+        "properties": {
+            "workflow": {"type": "boolean", "enum": [True]},
+            "steps": {"type": "array", "items": {"anyOf": actions}, "minItems": 1},
+        },
+        "required": ["workflow", "steps"],
+    }
+    return {"anyOf": actions + [workflow]}
+
+
+def build_flat_schema() -> Dict[str, Any]:
+    """
+    Single-object schema for APIs without ``anyOf`` support (Gemini)
+
+    Every catalog parameter becomes an optional property; the per-action
+    requirements are enforced afterwards by the validator.
+    """
+    properties: Dict[str, Any] = {
+        "action": {
+            "type": "string",
+            "enum": [n for n in ACTION_CATALOG if n not in _INTERNAL_ACTIONS],
+        }
+    }
+    for name, params in ACTION_CATALOG.items():
+        for param, spec in params.items():
+            properties.setdefault(param, {"type": spec["type"]})
+            if spec["type"] == "array":
+                properties[param]["items"] = {"type": "string"}
+
+    step = {"type": "object", "properties": dict(properties), "required": ["action"]}
+    properties["workflow"] = {"type": "boolean"}
+    properties["steps"] = {"type": "array", "items": step}
+    return {"type": "object", "properties": properties}
+
+
+ACTION_SCHEMA = build_action_schema()
+WORKFLOW_SCHEMA = build_action_schema(workflows=True)
+GEMINI_RESPONSE_SCHEMA = build_flat_schema()
+
+
+class ActionValidator:
+    """
+    Validator compiled once from the catalog into per-action check tables
+
+    Extra keys (e.g. "metadata") are allowed; missing required parameters,
+    wrong types and values outside an enum are rejected. ``None`` counts as
+    an absent optional parameter, matching how the executors read them.
+    """
+
+    def __init__(self, catalog: Dict[str, Dict[str, Dict[str, Any]]] = ACTION_CATALOG):
+        self._checks: Dict[str, List[Tuple[str, bool, tuple, Optional[frozenset]]]] = {
+            name: [
+                (
+                    param,
+                    bool(spec.get("required")),
+                    _JSON_TYPES[spec["type"]],
+                    frozenset(spec["enum"]) if "enum" in spec else None,
+                )
+                for param, spec in params.items()
+            ]
+            for name, params in catalog.items()
+        }
+
+    def validate(self, result: Any) -> Optional[str]:
+        """
+        Check a parsed LLM result
+
+        Returns:
+            None if valid, otherwise a description of the first problem
+        """
+        if not isinstance(result, dict):
+            return "result is not a JSON object"
+
+        if result.get("workflow"):
+            steps = result.get("steps")
+            if not isinstance(steps, list) or not steps:
+                return "workflow needs a non-empty 'steps' array"
+            for i, step in enumerate(steps):
+                problem = self.validate(step)
+                if problem:
+                    return f"step {i + 1}: {problem}"
+                if step.get("workflow"):
+                    return f"step {i + 1}: nested workflows are not allowed"
+            return None
+
+        action = result.get("action")
+        checks = self._checks.get(action)
+        if checks is None:
+            return f"unknown action {action!r}"
+        for param, required, types, enum in checks:
+            value = result.get(param)
+            if value is None:
+                if required:
+                    return f"{action} requires '{param}'"
+                continue
+            if not isinstance(value, types) or isinstance(value, bool):
+                return f"{action}.{param} has the wrong type"
+            if enum is not None and value not in enum:
+                return f"{action}.{param} must be one of {sorted(enum)}"
+            if types == (list,) and not all(isinstance(v, str) for v in value):
+                return f"{action}.{param} must be a list of strings"
+        return None
+
+    def is_valid(self, result: Any) -> bool:
+        """Valid and not an error result"""
+        return self.validate(result) is None and result.get("action") != "error"
+
+
+validator = ActionValidator()
+
+
+def validate_action(result: Any) -> Optional[str]:
+    return validator.validate(result)
+
+
+def is_valid_action(result: Any) -> bool:
+    return validator.is_valid(result)
+
+
+def invalid_output_error(message: str) -> Dict[str, Any]:
+    """Error result for an answer that arrived but could not be used"""
+    return {"action": "error", "message": message, "metadata": {"invalid_output": True}}
@@ -0,0 +1,247 @@
+"""
+Paraphrase-tolerant command cache backed by a memory-mapped vector index.
+
+Commands are canonicalized (synonymous verbs, articles and application
+aliases collapse: "open the browser", "launch chrome" and "start google
+chrome" all become "open chrome") and embedded with a hashed character
+n-gram vectorizer. A lookup is a cosine nearest-neighbour search over the
+stored vectors; a neighbour above ``config.semantic_cache_threshold`` is
+reused if its parameters are all backed by the new command's words.
+"""
+
+import copy
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from actions.desktop import APP_ALIASES
+from config import CONFIG_DIR, config
+from llm.command_cache import CommandCache
+from llm.normalize import NUMBER_WORDS, normalize_command, parse_number
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = CONFIG_DIR / "semantic_cache.npy"
+ENTRIES_FILE = CONFIG_DIR / "semantic_cache.json"
+
+VERB_SYNONYMS = {
+    "launch": "open", "start": "open", "run": "open", "load": "open",
+    "quit": "close", "exit": "close", "kill": "close",
+    "focus": "switch", "goto": "switch",
+}
+_STOPWORDS = {"the", "a", "an", "my", "this", "program", "app", "application", "exe"}
+
+# Application aliases collapse onto one spoken name per executable
+_APP_NAMES: Dict[str, str] = {}
+for _alias, _exe in APP_ALIASES.items():
+    _APP_NAMES.setdefault(_exe, _alias)
+_APPS = sorted(
+    ((alias.split(), _APP_NAMES[exe]) for alias, exe in APP_ALIASES.items()),
+    key=lambda item: len(item[0]),
+    reverse=True,
+)
+
+
+def canonicalize(text: str) -> str:
+    """Collapse verbs, fillers, number words and app aliases so paraphrases share a form"""
+    tokens = normalize_command(text).split()
+    if tokens:
+        tokens[0] = VERB_SYNONYMS.get(tokens[0], tokens[0])
+    tokens = [t for t in tokens if t not in _STOPWORDS] or tokens
+    tokens = [str(NUMBER_WORDS[t]) if t in NUMBER_WORDS else t for t in tokens]
+
+    result: List[str] = []
+    i = 0
+    while i < len(tokens):
+        for alias, name in _APPS:
+            if tokens[i : i + len(alias)] == alias:
+                result.append(name)
+                i += len(alias)
+                break
+        else:
+            result.append(tokens[i])
+            i += 1
+    return " ".join(result)
+
+
+def embed(canonical: str, dim: int) -> np.ndarray:
+    """L2-normalized hashed character 3/4-gram and word counts"""
+    vector = np.zeros(dim, dtype=np.float32)
+    padded = f" {canonical} "
+    features = [padded[i : i + n] for n in (3, 4) for i in range(len(padded) - n + 1)]
+    features += [f"w:{w}" for w in canonical.split()]
+    for feature in features:
+        vector[zlib.crc32(feature.encode("utf-8")) % dim] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _numbers(tokens: List[str]) -> List[int]:
+    return [n for n in (parse_number(t) for t in tokens) if n is not None]
+
+
+def _supported(result: Dict[str, Any], stored_key: str, query: str) -> bool:
+    """
+    Whether a neighbour's result may be reused for the query
+
+    The verb and all numbers must match, and every string parameter must be
+    made of words the query contains, so "open chrome" is never served for
+    "open firefox" and "type hello" never for "type hallo".
+    """
+    stored_tokens, query_tokens = stored_key.split(), query.split()
+    if stored_tokens[:1] != query_tokens[:1]:
+        return False
+    if _numbers(stored_tokens) != _numbers(query_tokens):
+        return False
+    words = set(query_tokens)
+    steps = result.get("steps", []) if result.get("workflow") else [result]
+    for step in steps:
+        for param, value in step.items():
+            if param == "action" or not isinstance(value, str):
+                continue
+            if not set(canonicalize(value).split()) <= words:
+                return False
+    return True
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache over canonicalized command embeddings
+
+    Vectors live in a memory-mapped ``.npy`` matrix (one row per entry),
+    the results and LRU timestamps in a JSON sidecar. When full, the least
+    recently used row is overwritten.
+    """
+
+    def __init__(
+        self,
+        vectors_path: Optional[Path] = None,
+        entries_path: Optional[Path] = None,
+        capacity: Optional[int] = None,
+    ):
+        self._vectors_path = Path(vectors_path) if vectors_path else VECTORS_FILE
+        self._entries_path = Path(entries_path) if entries_path else ENTRIES_FILE
+        self._capacity = capacity or config.semantic_cache_size
+        self._dim = config.semantic_cache_dim
+        self._threshold = config.semantic_cache_threshold
+        self._lock = threading.Lock()
+        self._entries: List[Dict[str, Any]] = []
+        self._slots: Dict[str, int] = {}
+        self._hits = 0
+        self._misses = 0
+        self._vectors = self._open_vectors()
+
+    def _open_vectors(self) -> np.memmap:
+        shape = (self._capacity, self._dim)
+        if self._vectors_path.exists() and self._entries_path.exists():
+            try:
+                vectors = np.lib.format.open_memmap(self._vectors_path, mode="r+")
+                with open(self._entries_path, "r") as f:
+                    entries = json.load(f)
+                if vectors.shape == shape and len(entries) <= self._capacity:
+                    self._entries = entries
+                    self._slots = {e["key"]: i for i, e in enumerate(entries)}
+                    logger.info("Loaded %d semantic cache entries", len(entries))
+                    return vectors
+                logger.info("Semantic cache shape changed, starting empty")
+            except (ValueError, OSError, json.JSONDecodeError) as e:
+                logger.warning("Ignoring unreadable semantic cache: %s", e)
+        return np.lib.format.open_memmap(
+            self._vectors_path, mode="w+", dtype=np.float32, shape=shape
+        )
+
+    def _save_entries(self):
+        self._vectors.flush()
+        tmp_path = self._entries_path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self._entries_path)
+        except IOError as e:
+            logger.warning("Failed to persist semantic cache: %s", e)
+
+    def get(self, command_text: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the result of a paraphrase of this command
+
+        Returns:
+            Copy of the neighbour's result with ``metadata.similarity``, or None
+        """
+        key = canonicalize(command_text)
+        if not key:
+            return None
+        query = embed(key, self._dim)
+        with self._lock:
+            if not self._entries:
+                self._misses += 1
+                return None
+            scores = self._vectors[: len(self._entries)] @ query
+            best = int(np.argmax(scores))
+            similarity = float(scores[best])
+            entry = self._entries[best]
+            if similarity < self._threshold or not _supported(
+                entry["result"], entry["key"], key
+            ):
+                self._misses += 1
+                return None
+            entry["last_used"] = time.time()
+            self._hits += 1
+            result = copy.deepcopy(entry["result"])
+
+        logger.info(
+            "Semantic cache matched '%s' to '%s' (%.2f)", command_text, entry["key"], similarity
+        )
+        result["metadata"] = {"source": "semantic_cache", "similarity": round(similarity, 3)}
+        return result
+
+    def put(self, command_text: str, result: Dict[str, Any]) -> bool:
+        """
+        Store a result under the command's canonical form
+
+        Returns:
+            True if stored (the command cache's bypass rules apply)
+        """
+        if not CommandCache.is_cacheable(normalize_command(command_text), result):
+            return False
+        key = canonicalize(command_text)
+        stored = {k: v for k, v in result.items() if k != "metadata"}
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None and len(self._entries) < self._capacity:
+                slot = len(self._entries)
+                self._entries.append({})
+            elif slot is None:
+                slot = min(
+                    range(len(self._entries)), key=lambda i: self._entries[i]["last_used"]
+                )
+                del self._slots[self._entries[slot]["key"]]
+            self._entries[slot] = {"key": key, "result": stored, "last_used": time.time()}
+            self._slots[key] = slot
+            self._vectors[slot] = embed(key, self._dim)
+            self._save_entries()
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._slots.clear()
+            self._vectors[:] = 0
+            self._save_entries()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "capacity": self._capacity,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / total if total else 0.0,
+            }
@@ -0,0 +1,166 @@
+"""
+Speculative command resolution on stable partial transcripts.
+
+While the user is still speaking, the listener reports a partial command
+once it has stopped changing. Resolving it in the background means the LLM
+answer is often ready by the time the final transcript arrives; it is reused
+only when the final text matches what was speculated.
+
+Speculation must be free of side effects: a thrown-away partial may still
+be running when it is discarded. The resolve function therefore does not
+record anything, and the result is committed (history, caches) only by
+:meth:`SpeculativeResolver.take` when the final transcript matches. Each
+speculation gets a cancel event, set when it is replaced or discarded, so a
+generation that is no longer wanted stops competing with the real command
+for the local model.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from config import config
+from llm.normalize import normalize_command, text_distance, tokenize
+
+logger = logging.getLogger(__name__)
+
+def _uses_changed_words(result: Dict[str, Any], speculated: str, final: str) -> bool:
+    """
+    Whether a parameter of the result contains a word that differs between
+    the speculated and the final command ("type hello worl" vs "... world")
+    """
+    changed = set(speculated.split()) - set(final.split())
+    if not changed:
+        return False
+    steps = result.get("steps") if result.get("workflow") else [result]
+    for step in steps or []:
+        for param, value in step.items():
+            if param == "action" or not isinstance(value, str):
+                continue
+            if changed & set(tokenize(value)):
+                return True
+    return False
+
+
+class SpeculativeResolver:
+    """
+    Run ``resolve(command, cancel_event)`` on partial transcripts ahead of
+    the final one, and ``commit(command, result)`` for a speculated result
+    that is reused
+
+    Only the latest speculation is kept; a newer stable partial replaces it.
+    :meth:`take` returns the speculated result when the final transcript is
+    within ``config.speculative_max_distance`` (normalized edit distance) of
+    the speculated text and no parameter of the result was taken from a word
+    that changed; otherwise the speculation is discarded.
+    """
+
+    def __init__(
+        self,
+        resolve: Callable[[str, threading.Event], Dict[str, Any]],
+        commit: Callable[[str, Dict[str, Any]], None],
+    ):
+        self._resolve = resolve
+        self._commit = commit
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="Speculate")
+        self._lock = threading.Lock()
+        self._key: Optional[str] = None
+        self._future: Optional[Future] = None
+        self._cancel: Optional[threading.Event] = None
+        self._stats = {"started": 0, "reused": 0, "discarded": 0, "saved_seconds": 0.0}
+
+    def speculate(self, partial_text: str):
+        """Start resolving a partial command unless it is already in flight"""
+        key = normalize_command(partial_text)
+        if not key:
+            return
+        with self._lock:
+            if key == self._key:
+                return
+            if self._future is not None:
+                self._future.cancel()
+                self._cancel.set()
+                self._stats["discarded"] += 1
+            logger.debug("Speculating on partial command: %s", key)
+            self._key = key
+            self._cancel = threading.Event()
+            self._future = self._executor.submit(
+                self._timed_resolve, partial_text, self._cancel
+            )
+            self._stats["started"] += 1
+
+    def _timed_resolve(self, text: str, cancel_event: threading.Event):
+        start = time.time()
+        result = self._resolve(text, cancel_event)
+        return result, time.time() - start
+
+    def take(self, final_text: str) -> Optional[Dict[str, Any]]:
+        """
+        Claim the speculated result for the final transcript
+
+        Args:
+            final_text: Final command text from the recognizer
+
+        Returns:
+            The speculated result (waiting for it if still running), or None
+            if there was no speculation or it does not match
+        """
+        with self._lock:
+            key, future, cancel = self._key, self._future, self._cancel
+            self._key, self._future, self._cancel = None, None, None
+        if future is None:
+            return None
+
+        final_key = normalize_command(final_text)
+        distance = text_distance(key, final_key)
+        if distance > config.speculative_max_distance:
+            future.cancel()
+            cancel.set()
+            self._count("discarded")
+            logger.debug("Discarded speculation '%s' for '%s'", key, final_text)
+            return None
+
+        claimed_at = time.time()
+        try:
+            result, elapsed = future.result()
+        except Exception as e:
+            logger.warning("Speculative resolution failed: %s", e)
+            self._count("discarded")
+            return None
+
+        if result.get("action") == "error" or _uses_changed_words(result, key, final_key):
+            self._count("discarded")
+            return None
+
+        self._commit(final_text, result)
+
+        # Without speculation resolution would only have started now
+        saved = max(0.0, elapsed - (time.time() - claimed_at))
+        with self._lock:
+            self._stats["reused"] += 1
+            self._stats["saved_seconds"] += saved
+        logger.info(
+            "Reused speculative result for '%s' (%.0f ms saved)", final_text, saved * 1000
+        )
+        result = dict(result)
+        result["metadata"] = {**result.get("metadata", {}), "speculative": True}
+        return result
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        finished = stats["reused"] + stats["discarded"]
+        stats["hit_rate"] = stats["reused"] / finished if finished else 0.0
+        return stats
+
+    def shutdown(self):
+        with self._lock:
+            if self._cancel is not None:
+                self._cancel.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,68 @@
+"""
+Incremental JSON extraction for streamed LLM output.
+"""
+
+from typing import Optional
+
+
+class IncrementalJSONParser:
+    """
+    Find the first complete top-level JSON object in a stream of text chunks
+
+    Text before the opening brace (markdown fences, chatter) is skipped. Braces
+    inside string literals are ignored, so the object is reported exactly when
+    its closing brace arrives and the rest of the generation can be dropped.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._done = False
+        self.chars_seen = 0
+
+    def feed(self, chunk: str) -> Optional[str]:
+        """
+        Consume the next piece of text
+
+        Args:
+            chunk: Text fragment from the stream
+
+        Returns:
+            The complete JSON object text once its closing brace is seen,
+            otherwise None
+        """
+        if self._done:
+            return None
+
+        for ch in chunk:
+            self.chars_seen += 1
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    self._buffer.append(ch)
+                continue
+
+            self._buffer.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._done = True
+                    return "".join(self._buffer)
+        return None
+
+    @property
+    def done(self) -> bool:
+        return self._done
@@ -0,0 +1,176 @@
+"""
+Keeps the Ollama model resident so commands never pay the model load time.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from config import config
+from llm.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+
+class ModelWarmthManager:
+    """
+    Preload an Ollama model and keep it loaded while the assistant is in use
+
+    Ollama unloads a model ``keep_alive`` seconds after its last request. The
+    manager preloads the model with an empty generate call, tracks when it
+    will be unloaded and re-warms it shortly before that point as long as a
+    command was processed within the active window. ``on_warm`` runs after a
+    load that followed an unload, e.g. to re-prime the prompt prefix.
+
+    Residency states: "unknown", "loading", "warm", "cold", "error".
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        model: Optional[str] = None,
+        on_warm: Optional[Callable[[], None]] = None,
+    ):
+        self._url = url or config.ollama_url
+        self._model = model or config.ollama_model
+        self._keep_alive = config.ollama_keep_alive
+        self._margin = config.ollama_rewarm_margin
+        self._active_window = config.ollama_active_window
+        self._http = get_http_client()
+        self._on_warm = on_warm
+
+        self._lock = threading.Lock()
+        self._state = "unknown"
+        self._expires_at = 0.0
+        self._last_activity = 0.0
+        self._last_load_seconds = None
+        self._preloads = 0
+        self._running = False
+        self._wake = threading.Event()
+        self._thread = None
+
+    @property
+    def keep_alive(self) -> int:
+        return self._keep_alive
+
+    def preload(self) -> bool:
+        """
+        Load the model with an empty generate request
+
+        Returns:
+            True if the model is loaded
+        """
+        with self._lock:
+            self._state = "loading"
+        start = time.time()
+        try:
+            resp = self._http.post(
+                f"{self._url}/api/generate",
+                json={"model": self._model, "keep_alive": self._keep_alive},
+                read_timeout=config.ollama_load_timeout,
+            )
+            resp.raise_for_status()
+        except Exception as e:
+            logger.warning("Failed to preload Ollama model %s: %s", self._model, e)
+            with self._lock:
+                self._state = "error"
+            return False
+
+        elapsed = time.time() - start
+        with self._lock:
+            was_resident = self._expires_at > start
+            self._state = "warm"
+            self._expires_at = time.time() + self._keep_alive
+            self._last_load_seconds = elapsed
+            self._preloads += 1
+        logger.info("Ollama model %s warm (%.2fs)", self._model, elapsed)
+        if self._on_warm and not was_resident:
+            self._on_warm()
+        return True
+
+    def note_activity(self):
+        """Record a request that carried keep_alive and so extended residency"""
+        now = time.time()
+        with self._lock:
+            self._last_activity = now
+            self._expires_at = now + self._keep_alive
+            if self._state in ("unknown", "cold"):
+                self._state = "warm"
+
+    def refresh_residency(self) -> str:
+        """Ask Ollama which models are loaded and update the residency state"""
+        try:
+            resp = self._http.get(f"{self._url}/api/ps", read_timeout=5)
+            resp.raise_for_status()
+            models = resp.json().get("models", [])
+        except Exception as e:
+            logger.debug("Could not query Ollama residency: %s", e)
+            return self.state
+
+        loaded = any(self._model in m.get("name", "") for m in models)
+        with self._lock:
+            if self._state != "loading":
+                self._state = "warm" if loaded else "cold"
+            return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def _rewarm_loop(self):
+        self.preload()
+        while self._running:
+            with self._lock:
+                wait = self._expires_at - self._margin - time.time()
+            if wait > 0:
+                self._wake.wait(timeout=wait)
+                self._wake.clear()
+                continue
+            if not self._running:
+                break
+
+            with self._lock:
+                active = time.time() - self._last_activity < self._active_window
+            if active:
+                logger.debug("Re-warming Ollama model %s before idle unload", self._model)
+                if not self.preload():
+                    self._wake.wait(timeout=self._margin)
+            else:
+                # Let Ollama unload the model while the user is away
+                self._wake.wait(timeout=self._margin)
+                unloaded = self.refresh_residency() == "cold"
+                with self._lock:
+                    self._expires_at = 0.0 if unloaded else time.time() + self._margin
+
+    def start(self):
+        """Preload the model and keep it warm in the background"""
+        if self._running:
+            return
+        self._running = True
+        self._last_activity = time.time()
+        self._thread = threading.Thread(
+            target=self._rewarm_loop, daemon=True, name="OllamaWarmth"
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def get_status(self) -> Dict[str, Any]:
+        """Current residency state of the model"""
+        with self._lock:
+            expires_in = max(0.0, self._expires_at - time.time())
+            return {
+                "model": self._model,
+                "state": self._state,
+                "expires_in": round(expires_in, 1) if self._state == "warm" else None,
+                "keep_alive": self._keep_alive,
+                "last_load_seconds": self._last_load_seconds,
+                "preloads": self._preloads,
+            }
@@ -26,8 +26,10 @@ logger = logging.getLogger("main")
 
 from config import config
 from voice.listener import VoiceListener
+from voice.model_registry import get_model_registry
 from voice.speaker import Speaker
 from llm.hybrid_processor import HybridLLMProcessor
+from llm.speculative import SpeculativeResolver
 from llm.workflow_engine import WorkflowEngine
 from gaze.tracker import GazeTracker
 from gaze.calibration import GazeCalibrator
@@ -119,6 +121,11 @@ class DesktopAssistant:
         self._running = False
         self._speaker = Speaker()
         self._llm = HybridLLMProcessor()
+        self._speculator = (
+            SpeculativeResolver(self._llm.resolve_speculative, self._llm.commit_result)
+            if config.speculative_enabled
+            else None
+        )
         self._workflow_engine = WorkflowEngine(self._execute_single_action)
         self._overlay = StatusOverlay() if _HAS_OVERLAY else DummyOverlay()
         self._listener = None
@@ -153,9 +160,18 @@ class DesktopAssistant:
             daemon=True,
         ).start()
 
+    def _on_partial_command(self, partial_command):
+        """Start resolving a stable partial command while the user is still speaking"""
+        if self._speculator:
+            self._speculator.speculate(partial_command)
+
     def _process_command(self, command):
         try:
-            action_or_workflow = self._llm.process_command(command)
+            action_or_workflow = None
+            if self._speculator:
+                action_or_workflow = self._speculator.take(command)
+            if action_or_workflow is None:
+                action_or_workflow = self._llm.process_command(command)
             logger.info("LLM response: %s", action_or_workflow)
 
             # Check if it's a workflow or single action
@@ -172,6 +188,7 @@ class DesktopAssistant:
                 self._speaker.say(f"Executing {len(steps)} step workflow")
 
                 result = self._workflow_engine.execute_workflow(steps)
+                self._llm.record_workflow(command, action_or_workflow, result["success"])
 
                 if result["success"]:
                     message = result["message"]
@@ -301,6 +318,7 @@ class DesktopAssistant:
 
         elif act == "show_grid":
             self._overlay.show_grid()
+            self._set_listen_context("grid")
             return True, "Grid overlay shown. Say a number to click that cell."
 
         elif act == "grid_click":
@@ -308,11 +326,13 @@ class DesktopAssistant:
             cx, cy = self._overlay.get_grid_cell_center(cell)
             if cx is not None:
                 self._overlay.hide_grid()
+                self._set_listen_context("idle")
                 return mouse.click(x=cx, y=cy)
             return False, f"Invalid grid cell: {cell}"
 
         elif act == "hide_grid":
             self._overlay.hide_grid()
+            self._set_listen_context("idle")
             return True, "Grid hidden"
 
         elif act == "volume":
@@ -347,8 +367,18 @@ class DesktopAssistant:
 
         elif act == "clarify":
             msg = action.get("message", "Could you please repeat that?")
+            # A yes/no answer needs no wake word
+            self._set_listen_context("confirm")
             return True, msg
 
+        elif act == "confirm":
+            self._set_listen_context("idle")
+            return True, "Confirmed"
+
+        elif act == "cancel":
+            self._set_listen_context("idle")
+            return True, "Cancelled"
+
         elif act == "error":
             return False, action.get("message", "Unknown error")
 
@@ -446,7 +476,7 @@ class DesktopAssistant:
             self._overlay.set_state("idle")
             self._overlay.set_result("Listening paused")
         else:
-            self._listener = VoiceListener(self._on_voice_command)
+            self._listener = VoiceListener(self._on_voice_command, self._on_partial_command)
             self._listener.start()
             self._overlay.set_state("idle")
             self._overlay.set_result("Listening resumed")
@@ -468,7 +498,7 @@ class DesktopAssistant:
         """Toggle listening (for WebSocket commands)"""
         if enabled:
             if not self._listener or not self._listener.is_running:
-                self._listener = VoiceListener(self._on_voice_command)
+                self._listener = VoiceListener(self._on_voice_command, self._on_partial_command)
                 self._listener.start()
                 self._overlay.set_state("idle")
                 self._overlay.set_result("Listening resumed")
@@ -478,6 +508,12 @@ class DesktopAssistant:
                 self._overlay.set_state("idle")
                 self._overlay.set_result("Listening paused")
 
+    def _unload_models(self):
+        """Release speech models under memory pressure (reloaded on next start)"""
+        registry = get_model_registry()
+        unloaded = registry.unload()
+        logger.info("Speech models unloaded: %s (%s)", unloaded or "none", registry.get_stats())
+
     def _toggle_gaze_tracking(self, enabled):
         """Toggle gaze tracking (for WebSocket commands)"""
         if enabled:
@@ -491,11 +527,18 @@ class DesktopAssistant:
         """Show grid overlay (for WebSocket commands)"""
         if self._overlay:
             self._overlay.show_grid()
+            self._set_listen_context("grid")
 
     def _hide_grid(self):
         """Hide grid overlay (for WebSocket commands)"""
         if self._overlay:
             self._overlay.hide_grid()
+            self._set_listen_context("idle")
+
+    def _set_listen_context(self, context: str):
+        """Switch the voice listener's grammar to what can be said next"""
+        if self._listener and self._listener.is_running:
+            self._listener.set_context(context)
 
     def _update_config(self, config_updates):
         """Update configuration (for WebSocket commands)"""
@@ -504,10 +547,12 @@ class DesktopAssistant:
         pass
 
     def _log_correction(self, original_command, correct_action):
-        """Log correction for fine-tuning (for WebSocket commands)"""
-        logger.info(f"Correction logged: '{original_command}' -> {correct_action}")
-        # TODO: Implement correction logging (Phase 4)
-        pass
+        """Store a correction and apply it to the local resolvers (for WebSocket commands)"""
+        stored, message = self._llm.add_correction(original_command, correct_action)
+        if stored:
+            logger.info(f"Correction logged: '{original_command}' -> {correct_action}")
+        else:
+            logger.warning(f"Correction for '{original_command}' not stored: {message}")
 
     def _setup_websocket_server(self):
         """Initialize and configure WebSocket server components"""
@@ -543,6 +588,9 @@ class DesktopAssistant:
             self._message_handler.register_handler(
                 "correct_interpretation", default_handlers.handle_correct_interpretation
             )
+            self._message_handler.register_handler(
+                "unload_models", default_handlers.handle_unload_models
+            )
 
             # Set message handler callback on WebSocket server
             self._websocket_server.set_message_handler(
@@ -596,6 +644,8 @@ class DesktopAssistant:
             logger.info("Using Gemini API for command processing")
         elif status["active_processor"] == "ollama":
             logger.info("Using Ollama for command processing")
+            if status["ollama_model"]:
+                logger.info(f"Ollama model residency: {status['ollama_model']['state']}")
             if status["gemini_available"]:
                 logger.info("Gemini also available as backup")
 
@@ -607,6 +657,9 @@ class DesktopAssistant:
 
         os.makedirs(os.path.expanduser("~/.desktop_llm_assistant"), exist_ok=True)
 
+        # Speech models load in the background while everything else starts
+        get_model_registry().preload()
+
         self._speaker.start()
         self._overlay.start()
         time.sleep(0.5)
@@ -636,9 +689,10 @@ class DesktopAssistant:
         else:
             logger.info("System tray not available, running without tray icon")
 
+        self._llm.warm_up()
         self._check_llm()
 
-        self._listener = VoiceListener(self._on_voice_command)
+        self._listener = VoiceListener(self._on_voice_command, self._on_partial_command)
         self._listener.start()
 
         tts_backend = self._speaker.backend or "none"
@@ -674,6 +728,10 @@ class DesktopAssistant:
         if self._gaze_tracker:
             self._gaze_tracker.stop()
 
+        if self._speculator:
+            logger.info("Speculative resolution: %s", self._speculator.get_stats())
+            self._speculator.shutdown()
+        self._llm.shutdown()
         self._speaker.stop()
         self._overlay.stop()
 
@@ -204,6 +204,19 @@ class DefaultHandlers:
         else:
             self.logger.warning("App does not implement _hide_grid")
 
+    def handle_unload_models(self, data: Dict[str, Any]):
+        """
+        Handle unload_models command (free speech model memory).
+
+        Expected data: {'type': 'unload_models'}
+        """
+        self.logger.info("Unload speech models")
+
+        if hasattr(self.app, "_unload_models"):
+            self.app._unload_models()
+        else:
+            self.logger.warning("App does not implement _unload_models")
+
     def handle_update_config(self, data: Dict[str, Any]):
         """
         Handle update_config command.
@@ -225,7 +238,7 @@ class DefaultHandlers:
 
     def handle_correct_interpretation(self, data: Dict[str, Any]):
         """
-        Handle correct_interpretation command (for fine-tuning).
+        Handle correct_interpretation command (corrections log).
 
         Expected data: {
             'type': 'correct_interpretation',
@@ -242,10 +255,8 @@ class DefaultHandlers:
 
         self.logger.info(f"Correction: '{original_command}' -> {correct_action}")
 
-        # Queue action for main thread (will be implemented in Phase 4)
+        # Stored in the corrections log and applied to the fast path/cache
         if hasattr(self.app, "_log_correction"):
             self.app._log_correction(original_command, correct_action)
         else:
-            self.logger.warning(
-                "App does not implement _log_correction (Phase 4 feature)"
-            )
+            self.logger.warning("App does not implement _log_correction")
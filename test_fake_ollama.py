@@ -0,0 +1,235 @@
+"""
+Test script for the Ollama client, run against fake servers instead of a model.
+
+``FakeOllama`` streams a canned action as NDJSON chunks, optionally followed
+by chatter the way an unconstrained model keeps talking, can fail every
+request with HTTP 500, and records whether the client hung up before the end
+of a stream. Run ``python test_fake_ollama.py`` from the project root to check
+early dispatch, generation abort, connection reuse and host failover.
+"""
+
+import contextlib
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+from config import config
+from llm.http_client import get_http_client
+from llm.processor import LLMProcessor
+
+ANSWER = '{"action": "open_app", "target": "notepad"}'
+CHATTER = " This opens Notepad, the plain text editor." * 4
+
+
+class FakeOllama:
+    """
+    Serve /api/chat, /api/generate, /api/ps and /api/tags on 127.0.0.1
+
+    Args:
+        chatter: Text streamed after the JSON answer
+        chunk_chars: Characters per streamed chunk
+        chunk_delay: Seconds between chunks (the fake generation speed)
+        fail: Answer every POST with HTTP 500
+    """
+
+    def __init__(
+        self,
+        chatter: str = "",
+        chunk_chars: int = 4,
+        chunk_delay: float = 0.02,
+        fail: bool = False,
+    ):
+        self.chatter = chatter
+        self.chunk_chars = chunk_chars
+        self.chunk_delay = chunk_delay
+        self.fail = fail
+        self.requests: List[Dict[str, Any]] = []
+        self.completed = 0
+        self.aborted = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> "FakeOllama":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread:
+            self._server.shutdown()
+            self._thread = None
+        self._server.server_close()
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, status: int, body: Dict[str, Any]):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                model = {
+                    "name": f"{config.ollama_model}:latest",
+                    "expires_at": "2099-01-01T00:00:00Z",
+                }
+                self._json(200, {"models": [model]})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                with fake._lock:
+                    fake.requests.append({"path": self.path, **request})
+                if fake.fail:
+                    self._json(500, {"error": "fake failure"})
+                    return
+                if self.path == "/api/generate":
+                    self._json(200, {"model": request.get("model"), "response": "", "done": True})
+                    return
+                text = ANSWER + fake.chatter
+                stats = {"done": True, "prompt_eval_count": 400, "prompt_eval_duration": 10**6}
+                if not request.get("stream", True):
+                    self._json(200, {"message": {"content": text}, "eval_count": 20, **stats})
+                    fake._count("completed")
+                    return
+                self._stream(text, stats)
+
+            def _stream(self, text: str, stats: Dict[str, Any]):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                chunks = [
+                    {"message": {"content": text[i : i + fake.chunk_chars]}, "done": False}
+                    for i in range(0, len(text), fake.chunk_chars)
+                ]
+                chunks.append({"message": {"content": ""}, **stats})
+                try:
+                    for chunk in chunks:
+                        line = (json.dumps(chunk) + "\n").encode()
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                        self.wfile.flush()
+                        time.sleep(fake.chunk_delay)
+                    self.wfile.write(b"0\r\n\r\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client closed the response: generation was aborted
+                    fake._count("aborted")
+                    self.close_connection = True
+                    return
+                fake._count("completed")
+
+        return Handler
+
+
+@contextlib.contextmanager
+def _overrides(**values):
+    """Change config values for the duration of a check, without saving them"""
+    previous = {key: config.get(key) for key in values}
+    config._data.update(values)
+    try:
+        yield
+    finally:
+        config._data.update(previous)
+
+
+def _run(processor, commands: int = 4, pause: float = 0.0) -> List[float]:
+    latencies = []
+    for i in range(commands):
+        start = time.perf_counter()
+        result = processor.process_command(f"open notepad number {i}")
+        latencies.append(time.perf_counter() - start)
+        if result.get("action") != "open_app":
+            raise AssertionError(f"unexpected result: {result}")
+        time.sleep(pause)
+    return latencies
+
+
+def check_streaming() -> bool:
+    """Early dispatch, abort without structured output, reuse with it"""
+    ok = True
+    fake = FakeOllama(chatter=CHATTER).start()
+    full_stream = (len(ANSWER + CHATTER) / fake.chunk_chars + 1) * fake.chunk_delay
+    try:
+        with _overrides(ollama_stream=True, structured_output=False):
+            latencies = _run(LLMProcessor(url=fake.url))
+            time.sleep(full_stream)
+        print(
+            f"unconstrained: answer in {max(latencies) * 1000:.0f} ms of a "
+            f"{full_stream * 1000:.0f} ms stream, {fake.aborted}/4 generations aborted"
+        )
+        ok &= max(latencies) < full_stream and fake.aborted == 4
+
+        host = fake.url.split("//", 1)[1]
+        before = get_http_client().get_stats().get(host, {}).get("reused", 0)
+        with _overrides(ollama_stream=True, structured_output=True):
+            processor = LLMProcessor(url=fake.url)
+            # Wait for each stream's tail so its connection is back in the pool
+            _run(processor, pause=full_stream)
+        reused = get_http_client().get_stats()[host]["reused"] - before
+        warm = processor._prefill.get_stats()["warm"] or {"samples": 0}
+        print(
+            f"structured: {reused}/4 connections reused, "
+            f"{warm['samples'] + 1}/4 prefill samples kept"
+        )
+        ok &= reused >= 3 and warm["samples"] == 3
+    finally:
+        fake.stop()
+    return ok
+
+
+def check_failover() -> bool:
+    """A failing host and a dead host are skipped for a healthy one"""
+    failing = FakeOllama(fail=True).start()
+    healthy = FakeOllama().start()
+    dead = FakeOllama()
+    dead_url = dead.url
+    dead.stop()
+    try:
+        processor = LLMProcessor(url=f"{failing.url},{dead_url},{healthy.url}")
+        # Replace the random tie-break order so the bad hosts are tried first
+        processor._pool._rank = {failing.url: 0, dead_url: 1, healthy.url: 2}
+        _run(processor)
+        pool = processor._pool.get_stats()
+        failures = pool[failing.url]["failures"] + pool[dead_url]["failures"]
+        print(
+            f"failover: 4/4 answered by {healthy.url}, "
+            f"{failures} failed attempts on the bad hosts"
+        )
+        return len(healthy.requests) == 4 and failures >= 1
+    except AssertionError as e:
+        print(f"failover: {e}")
+        return False
+    finally:
+        failing.stop()
+        healthy.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.ERROR)
+    results = {"streaming": check_streaming(), "failover": check_failover()}
+    for name, passed in results.items():
+        print(f"{name}: {'ok' if passed else 'FAILED'}")
+    raise SystemExit(0 if all(results.values()) else 1)
@@ -0,0 +1,44 @@
+"""
+Test script for the conversation history.
+
+Checks when a command gets earlier turns as context, in particular around
+clarification questions. Run ``python test_history.py`` from the project
+root, or collect it with pytest.
+"""
+
+from llm.history import ConversationHistory
+
+CLARIFY = {"action": "clarify", "question": "Which browser should I open?"}
+
+
+def test_answer_to_clarify_gets_context():
+    history = ConversationHistory(token_budget=1000, max_turns=10)
+    history.add("open the browser", CLARIFY)
+    assert history.awaiting_answer
+    assert history.context("chrome")
+    history.add("chrome", {"action": "open_app", "target": "chrome"})
+    assert not history.awaiting_answer
+    assert history.context("open notepad") == []
+
+
+def test_cancel_after_clarify_ends_the_question():
+    history = ConversationHistory(token_budget=1000, max_turns=10)
+    history.add("open the browser", CLARIFY)
+    history.add("cancel", {"action": "cancel"})
+    assert not history.awaiting_answer
+    assert history.context("open chrome") == []
+
+
+def test_confirm_after_clarify_ends_the_question():
+    history = ConversationHistory(token_budget=1000, max_turns=10)
+    history.add("open the browser", CLARIFY)
+    history.add("confirm", {"action": "confirm"})
+    assert not history.awaiting_answer
+    assert history.context("open chrome") == []
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
@@ -0,0 +1,81 @@
+"""
+Recognizer grammars for each listening context.
+
+- "idle": only the wake phrase; everything else decodes to ``[unk]``
+- "command": open vocabulary, for the command after the wake word
+- "grid": the cell numbers of the grid overlay, spoken without a wake word
+- "confirm": yes/no after a clarification question
+
+Constrained grammars are far cheaper to decode than the full language
+model and cannot produce near-miss words, so grid clicks and answers are
+turned into commands here without involving the LLM.
+"""
+
+from typing import List, Optional
+
+from config import config
+
+CONTEXTS = ("idle", "command", "grid", "confirm")
+
+UNKNOWN = "[unk]"
+
+_ONES = [
+    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine",
+    "ten", "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen",
+    "seventeen", "eighteen", "nineteen",
+]
+_TENS = ["", "", "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety"]
+
+CONFIRM_WORDS = {"yes": "confirm", "confirm": "confirm", "no": "cancel", "cancel": "cancel"}
+GRID_EXIT_WORDS = {"cancel": "hide grid"}
+
+
+def number_phrase(n: int) -> str:
+    """Spoken form of 0..99 as the recognizer writes it ("twenty one")"""
+    if n < 20:
+        return _ONES[n]
+    tens, ones = divmod(n, 10)
+    return _TENS[tens] + (f" {_ONES[ones]}" if ones else "")
+
+
+def grid_cells() -> int:
+    return config.grid_rows * config.grid_cols
+
+
+def grammar_for(context: str, wake_word: str) -> Optional[List[str]]:
+    """
+    Phrase list for a context, or None for open vocabulary
+
+    Every constrained grammar keeps the wake phrase, so a full command can
+    still be started from any context.
+    """
+    if context == "command":
+        return None
+    phrases = [wake_word]
+    if context == "grid":
+        phrases += [number_phrase(n) for n in range(1, grid_cells() + 1)]
+        phrases += list(GRID_EXIT_WORDS)
+    elif context == "confirm":
+        phrases += list(CONFIRM_WORDS)
+    return phrases + [UNKNOWN]
+
+
+def interpret(context: str, text: str) -> Optional[str]:
+    """
+    The command a constrained result stands for
+
+    Returns:
+        "click N" for a grid cell, "confirm"/"cancel" for an answer, or
+        None if the result is not an answer for this context
+    """
+    words = [w for w in text.split() if w != UNKNOWN]
+    phrase = " ".join(words)
+    if context == "grid":
+        if phrase in GRID_EXIT_WORDS:
+            return GRID_EXIT_WORDS[phrase]
+        for n in range(1, grid_cells() + 1):
+            if phrase == number_phrase(n):
+                return f"click {n}"
+    elif context == "confirm" and phrase in CONFIRM_WORDS:
+        return CONFIRM_WORDS[phrase]
+    return None
@@ -2,7 +2,14 @@ import json
 import queue
 import threading
 import logging
+import time
 from config import config
+from llm.normalize import text_distance
+from voice.grammars import CONTEXTS, grammar_for, interpret
+from voice.model_registry import get_model_registry
+from voice.ring_buffer import AudioRingBuffer
+from voice.transcriber import WhisperTranscriber, latency_summary, whisper_available
+from voice.vad import VADGate, vad_available
 
 logger = logging.getLogger(__name__)
 
@@ -14,65 +21,359 @@ except OSError as e:
     sd = None
     _HAS_AUDIO = False
 
-try:
-    from vosk import Model, KaldiRecognizer
-    _HAS_VOSK = True
-except ImportError:
-    logger.warning("Vosk not available")
-    Model = None
-    KaldiRecognizer = None
-    _HAS_VOSK = False
+# Longest utterance kept for whisper or a wake-word replay
+_MAX_UTTERANCE_SECONDS = 15
+
+# Audio the low-latency ring buffer holds before it overwrites the oldest
+_RING_SECONDS = 5
+
+# End-of-speech -> final result samples kept for the stats
+_MAX_LATENCY_SAMPLES = 200
 
 
 class VoiceListener:
-    def __init__(self, on_command_callback):
+    def __init__(self, on_command_callback, on_partial_command=None):
         self._callback = on_command_callback
+        # Called with the partial command once it has been unchanged for
+        # config.speculative_stable_ms of audio after the wake word
+        self._partial_callback = on_partial_command
+        self._last_partial = ""
+        self._partial_since = None
         self._audio_queue = queue.Queue()
         self._running = False
         self._listening = False
         self._wake_word = config.wake_word.lower()
-        self._model = None
         self._recognizer = None
         self._stream = None
         self._thread = None
+        # Silence is dropped before the decoder when webrtcvad is installed
+        self._vad = None
+        self._fed_bytes = 0
+        self._decoder_cpu = 0.0
+        # Low-latency mode: small device blocks into a ring buffer, read in
+        # chunks sized by whether someone is speaking
+        self._low_latency = config.audio_low_latency
+        self._ring = None
+        self._partial_active = False
+        self._chunk_captured_at = None
+        self._final_latency = []
+        # Two-pass mode: Vosk only spots the wake word, whisper transcribes
+        self._transcriber = None
+        self._utterance = []
+        self._utterance_bytes = 0
+        self._utterance_started = None
+        self._wake_heard = False
+        self._wake_spot = []
+        # Recognizer grammar by context (see voice.grammars); "command" is
+        # the open-vocabulary state entered after the wake word
+        self._grammars = config.asr_context_grammars
+        self._base_context = "idle" if self._grammars else "command"
+        self._context = self._base_context
+        self._requested_context = None
+        self._context_expires = None
+        self._context_lock = threading.Lock()
+        self._context_stats = {"switches": 0, "escalations": 0, "grid": 0, "confirm": 0}
 
-    def _load_model(self):
-        model_path = config.vosk_model_path
-        logger.info("Loading Vosk model from %s", model_path)
-        try:
-            self._model = Model(model_path)
-        except Exception:
-            logger.info("Local model not found, downloading small English model...")
-            try:
-                self._model = Model(lang="en-us")
-            except Exception as e:
-                logger.error("Failed to load Vosk model: %s", e)
-                self._model = None
-                return
-        self._recognizer = KaldiRecognizer(self._model, config.sample_rate)
+    def _create_recognizer(self):
+        """
+        A recognizer on the shared Vosk model (loaded once per process)
+
+        Returns:
+            False if the model is unavailable; the current recognizer is kept
+        """
+        recognizer = get_model_registry().new_recognizer(
+            grammar_for(self._context, self._wake_word)
+        )
+        if recognizer is None:
+            return False
+        self._recognizer = recognizer
+        return True
+
+    def set_context(self, context):
+        """
+        Switch the recognizer grammar, e.g. to "grid" while the grid is shown
+
+        Args:
+            context: One of voice.grammars.CONTEXTS; applied by the audio
+                thread before the next block
+        """
+        if context not in CONTEXTS:
+            raise ValueError(f"Unknown listening context: {context}")
+        if not self._grammars:
+            return
+        with self._context_lock:
+            self._requested_context = context
+
+    def _apply_context(self):
+        with self._context_lock:
+            requested, self._requested_context = self._requested_context, None
+        if requested:
+            self._base_context = requested
+            self._switch(requested)
+        elif self._context_expires and time.time() > self._context_expires:
+            logger.info("No answer, leaving %s context", self._context)
+            self._base_context = "idle"
+            self._switch("idle")
+
+    def _switch(self, context):
+        """Returns False if the context's recognizer could not be created"""
+        if context == "command" and self._transcriber:
+            # Whisper decodes commands; the first pass stays constrained
+            context = "idle"
+        self._context_expires = (
+            time.time() + config.asr_confirm_timeout if context == "confirm" else None
+        )
+        if context == self._context and self._recognizer:
+            return True
+        logger.debug("Listening context: %s -> %s", self._context, context)
+        previous, self._context = self._context, context
+        if not self._create_recognizer():
+            logger.error("Speech model unavailable, staying in %s context", previous)
+            self._context = previous
+            return False
+        self._context_stats["switches"] += 1
+        self._last_partial = ""
+        self._partial_since = None
+        return True
 
     def _audio_callback(self, indata, frames, time_info, status):
         if status:
             logger.warning("Audio status: %s", status)
-        self._audio_queue.put(bytes(indata))
+        if self._ring:
+            self._ring.write(bytes(indata))
+        else:
+            self._audio_queue.put((bytes(indata), time.perf_counter()))
 
-    def _process_loop(self):
-        while self._running:
+    def _next_chunk(self):
+        """
+        The next audio to decode and the capture time of its last block
+
+        In low-latency mode the chunk is small while speech is active, so
+        the end of speech is seen within a few blocks, and large in silence
+        to save decoder calls.
+        """
+        if not self._ring:
             try:
-                data = self._audio_queue.get(timeout=0.5)
+                return self._audio_queue.get(timeout=0.5)
             except queue.Empty:
+                return b"", None
+        speaking = self._vad.in_speech if self._vad else self._partial_active
+        chunk_ms = config.audio_speech_chunk_ms if speaking else config.audio_idle_chunk_ms
+        blocks = max(1, chunk_ms // config.audio_capture_ms)
+        idle_blocks = max(blocks, config.audio_idle_chunk_ms // config.audio_capture_ms)
+        return self._ring.read(blocks, idle_blocks, timeout=0.5)
+
+    def _process_loop(self):
+        while self._running:
+            data, captured_at = self._next_chunk()
+            self._apply_context()
+            if not data:
                 continue
+            self._chunk_captured_at = captured_at
 
-            if self._recognizer.AcceptWaveform(data):
-                result = json.loads(self._recognizer.Result())
-                text = result.get("text", "").strip().lower()
-                if text:
-                    self._handle_text(text)
-            else:
-                partial = json.loads(self._recognizer.PartialResult())
-                partial_text = partial.get("partial", "").strip().lower()
-                if partial_text and self._wake_word in partial_text:
-                    self._listening = True
+            ended = False
+            if self._vad:
+                data, ended = self._vad.process(data)
+            if data:
+                self._collect(data)
+                self._feed(data)
+            if ended and self._recognizer:
+                # Flush the utterance and start the next one from a clean state
+                start = time.thread_time()
+                result = json.loads(self._recognizer.FinalResult())
+                self._recognizer.Reset()
+                self._decoder_cpu += time.thread_time() - start
+                if result.get("text"):
+                    # The last speech frame was captured a hangover before
+                    # the frame that ended the utterance
+                    self._record_final_latency(
+                        captured_at - self._vad.pending_seconds - self._vad.hangover_seconds
+                    )
+                self._handle_result(result)
+                if self._transcriber:
+                    self._end_utterance()
+
+    def _record_final_latency(self, speech_ended_at):
+        self._final_latency.append(time.perf_counter() - speech_ended_at)
+        del self._final_latency[:-_MAX_LATENCY_SAMPLES]
+
+    def _collect(self, data):
+        """Keep the current utterance's audio for whisper or a wake-word replay"""
+        if not self._utterance:
+            self._utterance_started = time.perf_counter()
+        self._utterance.append(data)
+        self._utterance_bytes += len(data)
+        limit = _MAX_UTTERANCE_SECONDS * 2 * config.sample_rate
+        while self._utterance_bytes > limit and len(self._utterance) > 1:
+            self._utterance_bytes -= len(self._utterance.pop(0))
+
+    def _take_utterance(self):
+        audio = b"".join(self._utterance)
+        self._utterance = []
+        self._utterance_bytes = 0
+        self._utterance_started = None
+        return audio
+
+    def _spot_wake_word(self, text):
+        if self._wake_heard or self._wake_word not in text:
+            return
+        self._wake_heard = True
+        if self._utterance_started is not None:
+            self._wake_spot.append(time.perf_counter() - self._utterance_started)
+            del self._wake_spot[:-200]
+
+    def _end_utterance(self):
+        """Send a command utterance to whisper; drop anything else"""
+        audio = self._take_utterance()
+        wake_heard, self._wake_heard = self._wake_heard, False
+        if not wake_heard and not self._listening:
+            return
+        if self._transcriber.failed:
+            logger.warning("Whisper unavailable, command audio dropped")
+            return
+        self._transcriber.submit(
+            audio,
+            lambda text: self._handle_transcript(text, wake_heard),
+            time.perf_counter(),
+        )
+
+    def _handle_transcript(self, text, wake_heard):
+        """Extract the command from whisper's transcript of a command utterance"""
+        words = text.split()
+        wake_words = self._wake_word.split()
+        if self._wake_word in text:
+            text = text.split(self._wake_word, 1)[-1].strip()
+        elif wake_heard and text_distance(
+            " ".join(words[: len(wake_words)]), self._wake_word
+        ) <= 0.35:
+            # Whisper spelled the wake word differently ("hey assistance")
+            text = " ".join(words[len(wake_words) :])
+        elif wake_heard:
+            logger.info("Whisper did not confirm the wake word: '%s'", text)
+            return
+
+        if text:
+            logger.info("Command received: %s", text)
+            self._listening = False
+            self._callback(text)
+        else:
+            self._listening = True
+            logger.info("Wake word detected, listening for command...")
+
+    def _feed(self, data):
+        if self._recognizer is None:
+            return
+        start = time.thread_time()
+        accepted = self._recognizer.AcceptWaveform(data)
+        if accepted:
+            result = json.loads(self._recognizer.Result())
+        else:
+            partial = json.loads(self._recognizer.PartialResult())
+        self._decoder_cpu += time.thread_time() - start
+        self._fed_bytes += len(data)
+
+        if accepted:
+            self._partial_active = False
+            if not self._vad and result.get("text") and self._chunk_captured_at:
+                # Without VAD the decoder's own endpoint is the end of speech
+                self._record_final_latency(self._chunk_captured_at)
+            self._handle_result(result)
+            return
+        partial_text = partial.get("partial", "").strip().lower()
+        self._partial_active = bool(partial_text)
+        if self._transcriber:
+            # The wake-word grammar yields no command words to speculate on;
+            # the command text only exists once whisper has transcribed it
+            self._spot_wake_word(partial_text)
+            return
+        if self._context != "command":
+            if self._wake_word in partial_text:
+                self._escalate(self._take_utterance(), complete=False)
+            return
+        if partial_text and self._wake_word in partial_text:
+            self._listening = True
+        if self._partial_callback:
+            self._track_partial(partial_text)
+
+    def _escalate(self, audio, complete):
+        """
+        Wake word heard under a constrained grammar: re-decode the utterance
+        so far with the open vocabulary and keep listening with it
+
+        Args:
+            audio: The utterance's audio up to now
+            complete: The utterance already ended, so flush the result
+        """
+        if not self._switch("command"):
+            return
+        self._context_stats["escalations"] += 1
+        if audio:
+            self._collect(audio)
+            self._feed(audio)
+        if complete:
+            result = json.loads(self._recognizer.FinalResult())
+            self._recognizer.Reset()
+            self._handle_result(result)
+
+    def _handle_result(self, result):
+        text = result.get("text", "").strip().lower()
+        self._last_partial = ""
+        self._partial_since = None
+        audio = None if self._transcriber else self._take_utterance()
+
+        if self._context in ("grid", "confirm"):
+            command = interpret(self._context, text)
+            if command:
+                # Constrained answers need neither a wake word nor the LLM
+                self._context_stats[self._context] += 1
+                logger.info("%s answer: %s", self._context.capitalize(), command)
+                if self._context == "confirm":
+                    self._base_context = "idle"
+                    self._switch("idle")
+                self._callback(command)
+                return
+
+        if self._transcriber:
+            self._spot_wake_word(text)
+            if text == self._wake_word:
+                # Nothing but the wake word: the next utterance is the command
+                self._listening = True
+            return
+
+        if self._context == "command":
+            if text:
+                self._handle_text(text)
+            if not self._listening:
+                self._switch(self._base_context)
+        elif text == self._wake_word:
+            self._listening = True
+            self._switch("command")
+            logger.info("Wake word detected, listening for command...")
+        elif self._wake_word in text:
+            self._escalate(audio, complete=True)
+
+    def _track_partial(self, partial_text):
+        """Report the command part of a partial once it stops changing"""
+        if self._wake_word in partial_text:
+            command = partial_text.split(self._wake_word, 1)[-1].strip()
+        elif self._listening:
+            command = partial_text
+        else:
+            command = ""
+
+        # Capture time, so a decoding backlog does not count as stability
+        now = self._chunk_captured_at or time.perf_counter()
+        if not command or command != self._last_partial:
+            self._last_partial = command
+            self._partial_since = now if command else None
+            return
+        if (
+            self._partial_since is not None
+            and now - self._partial_since >= config.speculative_stable_ms / 1000
+        ):
+            # Once per plateau
+            self._partial_since = None
+            self._partial_callback(command)
 
     def _handle_text(self, text):
         if self._listening:
@@ -97,26 +398,59 @@ class VoiceListener:
     def start(self):
         if self._running:
             return
-        if not _HAS_AUDIO or not _HAS_VOSK:
+        has_vosk = get_model_registry().available("vosk")
+        if not _HAS_AUDIO or not has_vosk:
             logger.error(
                 "Voice listener cannot start: audio=%s vosk=%s. "
                 "Install PortAudio (libportaudio2) and vosk to enable voice.",
-                _HAS_AUDIO, _HAS_VOSK,
+                _HAS_AUDIO, has_vosk,
             )
             return
-        self._load_model()
-        if not self._model:
+        if config.asr_two_pass:
+            if whisper_available() and vad_available() and config.vad_enabled:
+                self._transcriber = WhisperTranscriber()
+                self._transcriber.start()
+            else:
+                logger.warning(
+                    "Two-pass ASR needs faster-whisper and webrtcvad (vad_enabled); "
+                    "using Vosk for commands"
+                )
+        if self._transcriber and self._partial_callback:
+            logger.info(
+                "Speculative resolution disabled: in two-pass mode Vosk only "
+                "decodes the wake word, so there are no partial commands"
+            )
+        if self._transcriber:
+            # The first pass only ever needs a constrained grammar
+            self._base_context = self._context = (
+                "idle" if self._context == "command" else self._context
+            )
+        if not self._create_recognizer():
             logger.error("Voice listener cannot start: speech model failed to load")
+            if self._transcriber:
+                self._transcriber.stop()
+                self._transcriber = None
             return
+        if config.vad_enabled and vad_available():
+            self._vad = VADGate()
+        elif config.vad_enabled:
+            logger.warning("webrtcvad not installed, decoding all audio")
+        if self._low_latency:
+            block_size = config.sample_rate * config.audio_capture_ms // 1000
+            self._ring = AudioRingBuffer(_RING_SECONDS * 1000 // config.audio_capture_ms)
+        else:
+            block_size = config.audio_block_size
         self._running = True
         self._stream = sd.RawInputStream(
             samplerate=config.sample_rate,
-            blocksize=config.audio_block_size,
+            blocksize=block_size,
             dtype="int16",
             channels=1,
             callback=self._audio_callback,
         )
         self._stream.start()
+        # Keeps the model loaded while this listener decodes with it
+        get_model_registry().retain("vosk")
         self._thread = threading.Thread(target=self._process_loop, daemon=True)
         self._thread.start()
         logger.info("Voice listener started (wake word: '%s')", self._wake_word)
@@ -130,7 +464,53 @@ class VoiceListener:
         if self._thread:
             self._thread.join(timeout=2)
             self._thread = None
-        logger.info("Voice listener stopped")
+            self._recognizer = None
+            get_model_registry().release("vosk")
+        logger.info("Voice listener stopped: %s", self.get_stats())
+        if self._transcriber:
+            self._transcriber.stop()
+            self._transcriber = None
+
+    def get_stats(self):
+        """
+        Audio gating and decoder CPU statistics
+
+        The CPU saved is estimated from the decoder's cost per second of
+        audio it did see, applied to the audio the VAD skipped.
+        """
+        fed_seconds = self._fed_bytes / 2 / config.sample_rate
+        stats = {
+            "decoded_seconds": fed_seconds,
+            "decoder_cpu_seconds": self._decoder_cpu,
+            "context": self._context,
+            "contexts": dict(self._context_stats),
+            "latency": {
+                "mode": "low_latency" if self._ring else "block",
+                "block_ms": (
+                    config.audio_capture_ms
+                    if self._ring
+                    else config.audio_block_size * 1000 // config.sample_rate
+                ),
+                "end_of_speech_to_final": latency_summary(self._final_latency),
+                "ring": self._ring.get_stats() if self._ring else None,
+            },
+            "vad": None,
+        }
+        if self._vad:
+            vad = self._vad.get_stats()
+            skipped = vad["audio_seconds"] - vad["speech_seconds"]
+            cost = self._decoder_cpu / fed_seconds if fed_seconds else 0.0
+            vad["estimated_cpu_saved_seconds"] = max(0.0, skipped * cost - vad["vad_cpu_seconds"])
+            stats["vad"] = vad
+        if self._transcriber:
+            # Per-stage latency: wake word spotted after speech onset, end of
+            # speech detected after the VAD hangover, then whisper's stages
+            stats["two_pass"] = {
+                "wake_spot": latency_summary(self._wake_spot),
+                "vad_hangover_ms": config.vad_silence_frames * self._vad.frame_ms,
+                "whisper": self._transcriber.get_stats(),
+            }
+        return stats
 
     @property
     def is_listening(self):
@@ -0,0 +1,237 @@
+"""
+Process-wide cache of speech recognition models.
+
+Loading the Vosk model takes seconds and hundreds of MB, and the whisper
+model more. The registry loads each model once, shares it between all
+listener instances (a paused and resumed listener only creates a new
+recognizer) and can preload them in the background at startup. Running
+listeners ``retain`` the models they decode with; ``unload`` drops the
+registry's reference to the models nobody retains, so their memory is
+released.
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+try:
+    from vosk import Model, KaldiRecognizer
+
+    _HAS_VOSK = True
+except ImportError:
+    Model = None
+    KaldiRecognizer = None
+    _HAS_VOSK = False
+
+try:
+    from faster_whisper import WhisperModel
+
+    _HAS_WHISPER = True
+except ImportError:
+    WhisperModel = None
+    _HAS_WHISPER = False
+
+
+def _load_vosk():
+    model_path = config.vosk_model_path
+    logger.info("Loading Vosk model from %s", model_path)
+    try:
+        return Model(model_path)
+    except Exception:
+        logger.info("Local model not found, downloading small English model...")
+        return Model(lang="en-us")
+
+
+def _load_whisper():
+    return WhisperModel(
+        config.whisper_model_size, device="cpu", compute_type=config.whisper_compute_type
+    )
+
+
+class _Entry:
+    __slots__ = ("model", "loading", "load_seconds", "loads", "error", "users")
+
+    def __init__(self):
+        self.model = None
+        self.loading: Optional[threading.Event] = None
+        self.load_seconds = None
+        self.loads = 0
+        self.error = None
+        self.users = 0
+
+
+class ModelRegistry:
+    """
+    Load-once model cache with single-flight loading
+
+    Concurrent requests for a model that is being loaded wait for that load
+    instead of starting another one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._entries: Dict[str, _Entry] = {}
+        self._recognizers = 0
+        if _HAS_VOSK:
+            self._register("vosk", _load_vosk)
+        if _HAS_WHISPER:
+            self._register("whisper", _load_whisper)
+
+    def _register(self, name: str, loader: Callable[[], Any]):
+        self._loaders[name] = loader
+        self._entries[name] = _Entry()
+
+    def available(self, name: str) -> bool:
+        """Whether the library for a model is installed"""
+        return name in self._loaders
+
+    def get(self, name: str) -> Optional[Any]:
+        """
+        The loaded model, loading it first if needed
+
+        Returns:
+            The model, or None if its library is missing or loading failed
+        """
+        if name not in self._loaders:
+            return None
+        with self._lock:
+            entry = self._entries[name]
+            if entry.model is not None:
+                return entry.model
+            loading = entry.loading
+            if loading is None:
+                loading = entry.loading = threading.Event()
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            loading.wait()
+            return entry.model
+
+        start = time.perf_counter()
+        try:
+            model = self._loaders[name]()
+            error = None
+        except Exception as e:
+            logger.error("Failed to load %s model: %s", name, e)
+            model, error = None, str(e)
+        with self._lock:
+            entry.model = model
+            entry.error = error
+            entry.loading = None
+            if model is not None:
+                entry.loads += 1
+                entry.load_seconds = time.perf_counter() - start
+                logger.info("%s model loaded in %.1fs", name, entry.load_seconds)
+        loading.set()
+        return model
+
+    def new_recognizer(self, grammar: Optional[List[str]] = None):
+        """
+        A fresh KaldiRecognizer on the shared Vosk model
+
+        Args:
+            grammar: Phrases to restrict decoding to; open vocabulary if None
+
+        Returns:
+            The recognizer, or None if the Vosk model is unavailable
+        """
+        model = self.get("vosk")
+        if model is None:
+            return None
+        with self._lock:
+            self._recognizers += 1
+        if grammar is None:
+            return KaldiRecognizer(model, config.sample_rate)
+        return KaldiRecognizer(model, config.sample_rate, json.dumps(grammar))
+
+    def retain(self, name: str):
+        """Mark a model as in use, so unload() keeps it"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                entry.users += 1
+
+    def release(self, name: str):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry.users > 0:
+                entry.users -= 1
+
+    def preload(self, names: Optional[List[str]] = None):
+        """Load models on a background thread (default: the ones the listener uses)"""
+        if names is None:
+            names = ["vosk"]
+            if config.asr_two_pass:
+                names.append("whisper")
+        names = [n for n in names if n in self._loaders]
+
+        def worker():
+            for name in names:
+                self.get(name)
+
+        threading.Thread(target=worker, daemon=True, name="ModelPreload").start()
+
+    def unload(self, name: Optional[str] = None) -> List[str]:
+        """
+        Drop a model (all models if name is None) under memory pressure
+
+        Models in use by a running listener are kept: dropping them would
+        free nothing while the listener holds them, and the next recognizer
+        it creates would reload the model on the audio thread. The next
+        request after an unload loads the model again.
+
+        Returns:
+            Names of the models that were unloaded
+        """
+        unloaded = []
+        with self._lock:
+            for key in [name] if name else list(self._entries):
+                entry = self._entries.get(key)
+                if entry is None or entry.model is None:
+                    continue
+                if entry.users:
+                    logger.info("Not unloading %s model: in use", key)
+                    continue
+                entry.model = None
+                unloaded.append(key)
+                logger.info("Unloaded %s model", key)
+        return unloaded
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "models": {
+                    name: {
+                        "loaded": entry.model is not None,
+                        "loading": entry.loading is not None,
+                        "loads": entry.loads,
+                        "users": entry.users,
+                        "load_seconds": entry.load_seconds,
+                        "error": entry.error,
+                    }
+                    for name, entry in self._entries.items()
+                },
+                "recognizers_created": self._recognizers,
+            }
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Process-wide shared model registry"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
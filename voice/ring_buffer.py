@@ -0,0 +1,71 @@
+"""
+Ring buffer between the audio callback and the recognizer thread.
+
+In low-latency mode the sound device delivers small blocks (20 ms by
+default). The callback only appends them here, stamped with their capture
+time; the recognizer thread takes them out in chunks whose size it picks
+per read, so it can decode in small steps during speech and in large,
+cheaper steps during silence. When the reader falls behind the oldest
+blocks are overwritten rather than letting latency grow without bound.
+"""
+
+import collections
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+class AudioRingBuffer:
+    """
+    Fixed-capacity FIFO of captured audio blocks
+
+    ``write`` is called from the audio callback and never blocks.
+    """
+
+    def __init__(self, max_blocks: int):
+        self._blocks: "collections.deque" = collections.deque(maxlen=max_blocks)
+        self._cond = threading.Condition()
+        self._overruns = 0
+        self._max_fill = 0
+
+    def write(self, data: bytes):
+        with self._cond:
+            if len(self._blocks) == self._blocks.maxlen:
+                self._overruns += 1
+            self._blocks.append((data, time.perf_counter()))
+            self._max_fill = max(self._max_fill, len(self._blocks))
+            self._cond.notify()
+
+    def read(
+        self, min_blocks: int, max_blocks: int, timeout: float
+    ) -> Tuple[bytes, Optional[float]]:
+        """
+        Take between min_blocks and max_blocks blocks
+
+        Waits until min_blocks are buffered; a backlog is drained up to
+        max_blocks at once so a slow reader catches up.
+
+        Returns:
+            Tuple of (audio, capture time of its last block), or (b"", None)
+            if nothing arrived before the timeout
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._blocks) >= min_blocks, timeout)
+            count = min(len(self._blocks), max_blocks)
+            if not count:
+                return b"", None
+            chunk = [self._blocks.popleft() for _ in range(count)]
+        return b"".join(data for data, _ in chunk), chunk[-1][1]
+
+    def clear(self):
+        with self._cond:
+            self._blocks.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "capacity_blocks": self._blocks.maxlen,
+                "buffered_blocks": len(self._blocks),
+                "max_fill_blocks": self._max_fill,
+                "overruns": self._overruns,
+            }
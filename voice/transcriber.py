@@ -0,0 +1,164 @@
+"""
+Second ASR pass: faster-whisper transcription of VAD-segmented commands.
+
+The continuously running recognizer only spots the wake word; the audio of
+an utterance that contains it (or follows it) is handed to a CPU int8
+faster-whisper model (``config.whisper_model_size``,
+``config.whisper_compute_type``) on a worker thread. The model comes from
+the shared model registry and is fetched by that thread at startup, so the
+first command does not pay for loading it.
+"""
+
+import logging
+import queue
+import re
+import statistics
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from config import config
+from voice.model_registry import get_model_registry
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[^\w\s']")
+
+# Per-stage latency samples kept for the stats
+_MAX_SAMPLES = 200
+
+
+def whisper_available() -> bool:
+    return get_model_registry().available("whisper")
+
+
+def latency_summary(samples: List[float]) -> Optional[Dict[str, float]]:
+    """Median and 95th percentile of latency samples in milliseconds"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return {
+        "p50_ms": statistics.median(ordered) * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000,
+    }
+
+
+class WhisperTranscriber:
+    """
+    Transcribe utterances one at a time on a background thread
+
+    ``submit`` queues 16-bit mono PCM and returns immediately; the callback
+    receives the lower-cased, punctuation-free transcript.
+    """
+
+    def __init__(self):
+        self._model = None
+        self._ready = threading.Event()
+        self._failed = False
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._load_wait = None
+        self._samples = {"queue": [], "transcribe": [], "end_to_text": []}
+        self._audio_seconds = 0.0
+        self._transcriptions = 0
+
+    def start(self):
+        """Start the worker, which loads the model before taking any audio"""
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._worker, daemon=True, name="Whisper")
+        self._thread.start()
+
+    def stop(self):
+        if self._thread:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+            if self._model is not None:
+                self._model = None
+                get_model_registry().release("whisper")
+
+    @property
+    def failed(self) -> bool:
+        """The model could not be loaded; submitted audio is dropped"""
+        return self._failed
+
+    def _load(self):
+        # Instant when the registry preloaded the model
+        start = time.perf_counter()
+        self._model = get_model_registry().get("whisper")
+        self._load_wait = time.perf_counter() - start
+        self._failed = self._model is None
+        if not self._failed:
+            get_model_registry().retain("whisper")
+
+    def _worker(self):
+        self._load()
+        self._ready.set()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            audio, callback, ended_at, queued_at = item
+            if self._failed:
+                continue
+            started = time.perf_counter()
+            try:
+                text = self._transcribe(audio)
+            except Exception as e:
+                logger.error("Whisper transcription failed: %s", e)
+                continue
+            done = time.perf_counter()
+            with self._lock:
+                self._record("queue", started - queued_at)
+                self._record("transcribe", done - started)
+                self._record("end_to_text", done - ended_at)
+                self._audio_seconds += len(audio) / 2 / config.sample_rate
+                self._transcriptions += 1
+            logger.info("Whisper: '%s' in %.0f ms", text, (done - started) * 1000)
+            callback(text)
+
+    def _record(self, stage: str, seconds: float):
+        samples = self._samples[stage]
+        samples.append(seconds)
+        if len(samples) > _MAX_SAMPLES:
+            del samples[0]
+
+    def _transcribe(self, audio: bytes) -> str:
+        samples = np.frombuffer(audio, dtype=np.int16).astype(np.float32) / 32768.0
+        segments, _ = self._model.transcribe(
+            samples,
+            language="en",
+            beam_size=1,
+            without_timestamps=True,
+            condition_on_previous_text=False,
+        )
+        text = " ".join(segment.text for segment in segments)
+        return " ".join(_PUNCTUATION.sub(" ", text).lower().split())
+
+    def submit(self, audio: bytes, callback: Callable[[str], None], ended_at: float):
+        """
+        Queue an utterance for transcription
+
+        Args:
+            audio: 16-bit mono PCM at config.sample_rate
+            callback: Called on the worker thread with the transcript
+            ended_at: time.perf_counter() when the end of speech was detected
+        """
+        self._queue.put((audio, callback, ended_at, time.perf_counter()))
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "model": config.whisper_model_size,
+                "ready": self._ready.is_set() and not self._failed,
+                "load_wait_seconds": self._load_wait,
+                "transcriptions": self._transcriptions,
+                "audio_seconds": self._audio_seconds,
+                "queue": latency_summary(self._samples["queue"]),
+                "transcribe": latency_summary(self._samples["transcribe"]),
+                "end_to_text": latency_summary(self._samples["end_to_text"]),
+            }
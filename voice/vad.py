@@ -0,0 +1,150 @@
+"""
+WebRTC voice activity detection in front of the speech recognizer.
+
+Audio blocks are cut into 10/20/30 ms frames and classified by webrtcvad.
+Only speech frames, a short pre-roll before speech onset and a hangover of
+``config.vad_silence_frames`` frames after it reach the recognizer; the
+end of the hangover marks the end of an utterance.
+"""
+
+import collections
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+try:
+    import webrtcvad
+
+    _HAS_WEBRTCVAD = True
+except ImportError:
+    webrtcvad = None
+    _HAS_WEBRTCVAD = False
+
+# Frames kept from before speech onset so the first phoneme is not clipped
+PRE_ROLL_MS = 300
+
+# Frame lengths webrtcvad accepts
+FRAME_MS_CHOICES = (10, 20, 30)
+
+
+def vad_available() -> bool:
+    return _HAS_WEBRTCVAD
+
+
+class VADGate:
+    """
+    Pass speech (plus pre-roll and hangover) through, drop silence
+
+    ``process`` takes raw 16-bit mono PCM of any length; samples that do not
+    fill a whole frame are carried over to the next call.
+    """
+
+    def __init__(
+        self,
+        sample_rate: Optional[int] = None,
+        frame_ms: Optional[int] = None,
+        aggressiveness: Optional[int] = None,
+        hangover_frames: Optional[int] = None,
+    ):
+        self._sample_rate = sample_rate or config.sample_rate
+        frame_ms = frame_ms or config.vad_frame_ms
+        if frame_ms not in FRAME_MS_CHOICES:
+            raise ValueError(f"VAD frame length must be one of {FRAME_MS_CHOICES} ms")
+        self._frame_ms = frame_ms
+        self._frame_bytes = self._sample_rate * frame_ms // 1000 * 2
+        self._vad = webrtcvad.Vad(
+            config.vad_aggressiveness if aggressiveness is None else aggressiveness
+        )
+        self._hangover = config.vad_silence_frames if hangover_frames is None else hangover_frames
+        self._pre_roll = collections.deque(maxlen=max(1, PRE_ROLL_MS // frame_ms))
+        self._pending = b""
+        self._in_speech = False
+        self._silence_run = 0
+        self._frames = 0
+        self._passed = 0
+        self._cpu = 0.0
+
+    @property
+    def in_speech(self) -> bool:
+        return self._in_speech
+
+    @property
+    def frame_ms(self) -> int:
+        return self._frame_ms
+
+    @property
+    def hangover_seconds(self) -> float:
+        """Silence after speech before an utterance end is reported"""
+        return self._hangover * self._frame_ms / 1000
+
+    @property
+    def pending_seconds(self) -> float:
+        """Audio held back after the last processed frame (e.g. after an end)"""
+        return len(self._pending) / 2 / self._sample_rate
+
+    def process(self, data: bytes) -> Tuple[bytes, bool]:
+        """
+        Gate one block of audio
+
+        Returns:
+            Tuple of (audio to feed the recognizer, utterance ended); the
+            end is reported once per utterance, when the hangover runs out
+        """
+        start = time.thread_time()
+        data = self._pending + data
+        usable = len(data) - len(data) % self._frame_bytes
+
+        out = []
+        ended = False
+        offset = 0
+        while offset < usable and not ended:
+            frame = data[offset : offset + self._frame_bytes]
+            offset += self._frame_bytes
+            self._frames += 1
+            speech = self._vad.is_speech(frame, self._sample_rate)
+            if self._in_speech:
+                out.append(frame)
+                self._passed += 1
+                if speech:
+                    self._silence_run = 0
+                else:
+                    self._silence_run += 1
+                    if self._silence_run >= self._hangover:
+                        self._in_speech = False
+                        self._silence_run = 0
+                        ended = True
+            elif speech:
+                self._in_speech = True
+                out.extend(self._pre_roll)
+                self._passed += len(self._pre_roll)
+                self._pre_roll.clear()
+                out.append(frame)
+                self._passed += 1
+            else:
+                self._pre_roll.append(frame)
+
+        # Audio after an utterance end waits for the next call, so it is
+        # never decoded as part of the utterance that just ended
+        self._pending = data[offset:]
+        self._cpu += time.thread_time() - start
+        return b"".join(out), ended
+
+    def reset(self):
+        self._pending = b""
+        self._pre_roll.clear()
+        self._in_speech = False
+        self._silence_run = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        frames = self._frames
+        return {
+            "frame_ms": self._frame_ms,
+            "audio_seconds": frames * self._frame_ms / 1000,
+            "speech_seconds": self._passed * self._frame_ms / 1000,
+            "skipped_fraction": 1 - self._passed / frames if frames else 0.0,
+            "vad_cpu_seconds": self._cpu,
+        }